@@ -0,0 +1,301 @@
+"""
+Benchmarks for ``ExtendedModelResource``, run with::
+
+    python manage.py benchmark [name name ...]
+
+Each benchmark receives the number of iterations to run, and the options of
+the ``benchmark`` command (such as the data volumes), and returns a list of
+``(label, measures)`` pairs, as returned by ``measure``. The data they create
+is rolled back by the ``benchmark`` command.
+"""
+
+import time
+from resource import getrusage, RUSAGE_SELF
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2 has no tracemalloc: the growth of the peak resident memory is
+    # measured instead.
+    tracemalloc = None
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import RegexURLResolver, resolve
+from django.db import connection
+from django.test.client import RequestFactory
+
+from tastypie import fields
+from tastypie.api import Api
+
+from extendedmodelresource import ExtendedModelResource
+
+from api.models import Entry, EntryInfo
+from api.resources import EntryResource
+from api.urls import v1_api
+
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    """
+    Register ``func`` as a benchmark, under its own name.
+    """
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def percentile(sorted_values, percent):
+    """
+    Return the ``percent`` percentile of a sorted list of values (nearest
+    rank).
+    """
+    index = int(round(percent / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def measure(func, iterations):
+    """
+    Call ``func`` ``iterations`` times and return a dictionary with the
+    ``mean``, ``p50``, ``p90`` and ``p99`` wall time of a call, in seconds,
+    the number of SQL ``queries`` per call, and either the memory allocated
+    by a call (``allocated_kb``, if ``tracemalloc`` is available) or the
+    growth of the peak resident memory during all the calls
+    (``max_rss_growth_kb``).
+    """
+    old_debug_cursor = connection.use_debug_cursor
+    connection.use_debug_cursor = True
+    max_rss = getrusage(RUSAGE_SELF).ru_maxrss
+    times = []
+    queries = 0
+
+    try:
+        for _ in xrange(iterations):
+            del connection.queries[:]
+            start = time.time()
+            func()
+            times.append(time.time() - start)
+            queries += len(connection.queries)
+    finally:
+        connection.use_debug_cursor = old_debug_cursor
+        del connection.queries[:]
+
+    times.sort()
+    measures = {
+        'iterations': iterations,
+        'mean': sum(times) / iterations,
+        'p50': percentile(times, 50),
+        'p90': percentile(times, 90),
+        'p99': percentile(times, 99),
+        'queries': float(queries) / iterations,
+    }
+
+    if tracemalloc is None:
+        # ``ru_maxrss`` is in kilobytes on Linux.
+        measures['max_rss_growth_kb'] = \
+                getrusage(RUSAGE_SELF).ru_maxrss - max_rss
+    else:
+        tracemalloc.start()
+        try:
+            func()
+            measures['allocated_kb'] = \
+                    tracemalloc.get_traced_memory()[1] / 1024.0
+        finally:
+            tracemalloc.stop()
+
+    return measures
+
+
+@benchmark
+def nested_resource_pool(iterations, **options):
+    """
+    ``dispatch_nested`` building the nested resource on every request (as it
+    used to) versus reusing the instance from the nested resource pool.
+    """
+    user = User.objects.create(username='benchmark')
+    entry = Entry.objects.create(user=user, title='Benchmark', body='Body',
+                    entryinfo=EntryInfo.objects.create(somefield='Benchmark'))
+
+    request = RequestFactory().get('/api/v1/entry/%s/entryinfo/' % entry.pk)
+    kwargs = {'api_name': 'v1', 'resource_name': 'entry',
+              'pk': str(entry.pk), 'nested_name': 'entryinfo'}
+
+    pooled = EntryResource(api_name='v1')
+    unpooled = EntryResource(api_name='v1')
+
+    def build_nested_resource(nested_name):
+        nested_resource = unpooled._nested[nested_name].to_class()
+        nested_resource._meta.api_name = unpooled._meta.api_name
+        return nested_resource
+    unpooled.get_nested_resource = build_nested_resource
+
+    return [
+        ('per_request', measure(
+                lambda: unpooled.dispatch_nested(request, **kwargs),
+                iterations)),
+        ('pooled', measure(
+                lambda: pooled.dispatch_nested(request, **kwargs),
+                iterations)),
+    ]
+
+
+def build_api(resource_count, nested_count, compiled_detail_urls):
+    """
+    Return an ``Api`` with ``resource_count`` resources named ``user<i>``,
+    each one with ``nested_count`` nested resources named ``nested<j>``.
+    """
+    api = Api(api_name='v1')
+
+    for i in xrange(resource_count):
+        meta = type('Meta', (object,), {
+            'queryset': User.objects.all(),
+            'resource_name': 'user%d' % i,
+            'compiled_detail_urls': compiled_detail_urls,
+        })
+        nested = type('Nested', (object,), dict(
+            ('nested%d' % j, fields.ToManyField(EntryResource, 'entries'))
+            for j in xrange(nested_count)))
+        resource_class = type('BenchmarkUserResource%d' % i,
+                              (ExtendedModelResource,),
+                              {'Meta': meta, 'Nested': nested,
+                               '__module__': __name__})
+        api.register(resource_class())
+
+    return api
+
+
+@benchmark
+def nested_url_resolving(iterations, **options):
+    """
+    Resolving the url of the last nested resource of the last registered
+    resource, with one url per nested resource versus
+    ``compiled_detail_urls``, for a growing number of resources and nested
+    resources.
+    """
+    results = []
+
+    for resource_count, nested_count in [(5, 5), (20, 10), (50, 20)]:
+        path = '/api/v1/user%d/1/nested%d/' % (resource_count - 1,
+                                                nested_count - 1)
+
+        for compiled_detail_urls in (False, True):
+            api = build_api(resource_count, nested_count,
+                            compiled_detail_urls)
+            resolver = RegexURLResolver(r'^/api/', api.urls)
+            results.append((
+                '%s_%dx%d' % (compiled_detail_urls and 'compiled' or 'urls',
+                              resource_count, nested_count),
+                measure(lambda: resolver.resolve(path), iterations)))
+
+    return results
+
+
+def create_data(users, entries):
+    """
+    Create ``users`` users with ``entries`` entries each, and return the
+    users.
+    """
+    created_users = [User.objects.create(username='benchmark%d' % i)
+                     for i in xrange(users)]
+
+    for user in created_users:
+        # SQLite does not insert more than 500 rows per query.
+        for start in xrange(0, entries, 100):
+            Entry.objects.bulk_create([
+                Entry(user=user, title='Entry %d' % i, slug='entry-%d' % i,
+                      body='Body %d' % i)
+                for i in xrange(start, min(start + 100, entries))])
+
+    return created_users
+
+
+def get_view(path):
+    """
+    Resolve ``path`` and return the response of its view to a GET request.
+    """
+    request = RequestFactory().get(path, {'format': 'json'})
+    match = resolve(path)
+    response = match.func(request, *match.args, **match.kwargs)
+
+    if response.status_code != 200:
+        raise RuntimeError("GET %s returned %d." % (path,
+                                                   response.status_code))
+
+    return response
+
+
+@benchmark
+def endpoints(iterations, users=10, entries=100, set_size=20, **options):
+    """
+    GET requests to the resources of the example project, through url
+    resolving and ``wrap_view``, with ``users`` users of ``entries`` entries
+    each. The nested resources are the ones of the last user, and of its
+    first entry.
+    """
+    user = create_data(users, entries)[-1]
+    user_entries = list(user.entries.order_by('pk')[:max(set_size, 1)])
+    entry = user_entries[0]
+    entry.entryinfo = EntryInfo.objects.create(somefield='Benchmark')
+    entry.save()
+
+    paths = [
+        ('detail', '/api/v1/user/%s/' % user.pk),
+        ('detail_by_name', '/api/v1/userbyname/%s/' % user.username),
+        ('list', '/api/v1/entry/'),
+        ('nested_list', '/api/v1/user/%s/entries/' % user.pk),
+        ('nested_detail', '/api/v1/user/%s/entries/%s/' % (user.pk,
+                                                           entry.pk)),
+        ('nested_to_one', '/api/v1/entry/%s/entryinfo/' % entry.pk),
+        ('multiple_get', '/api/v1/entry/set/%s/' % ';'.join(
+                            str(user_entry.pk) for user_entry in user_entries)),
+    ]
+
+    results = []
+    for label, path in paths:
+        results.append((label, measure(lambda: get_view(path), iterations)))
+
+    entry_resource = v1_api._registry['entry']
+    user_uri = '/api/v1/user/%s/' % user.pk
+    results.append(('uri_resolving', measure(
+                lambda: entry_resource.get_via_uri_resolver(user_uri),
+                iterations)))
+
+    return results
+
+
+def old_remove_api_resource_names(url_dict):
+    """
+    ``real_remove_api_resource_names`` as it was before ``RESERVED_KWARGS``.
+    """
+    kwargs_subset = url_dict.copy()
+
+    for key in ['api_name', 'resource_name', 'related_manager',
+                'child_object', 'parent_resource', 'nested_name',
+                'parent_object', 'parent_queryset', 'nested_list']:
+        try:
+            del(kwargs_subset[key])
+        except KeyError:
+            pass
+
+    return kwargs_subset
+
+
+@benchmark
+def reserved_kwargs(iterations, **options):
+    """
+    The removal of the url kwargs which are not lookups by
+    ``real_remove_api_resource_names``, done on every request, before and
+    after ``RESERVED_KWARGS``.
+    """
+    resource = v1_api._registry['user']
+    kwargs = {'api_name': 'v1', 'resource_name': 'user', 'pk': '1',
+              'nested_name': 'entries', 'parent_object': None,
+              'parent_queryset': None}
+
+    return [
+        ('kwargs_try_del', measure(
+                lambda: old_remove_api_resource_names(kwargs), iterations)),
+        ('kwargs_reserved', measure(
+                lambda: resource.real_remove_api_resource_names(kwargs),
+                iterations)),
+    ]
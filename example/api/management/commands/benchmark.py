@@ -0,0 +1,78 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import simplejson
+
+from api.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    args = '[benchmark benchmark ...]'
+    option_list = BaseCommand.option_list + (
+        make_option('--iterations', action='store', dest='iterations',
+            type='int', default=1000,
+            help='Number of calls timed for each case. Defaults to 1000.'),
+        make_option('--users', action='store', dest='users',
+            type='int', default=10,
+            help='Number of users created for the benchmarks of the '
+                 'endpoints. Defaults to 10.'),
+        make_option('--entries', action='store', dest='entries',
+            type='int', default=100,
+            help='Number of entries created for each user. Defaults to 100.'),
+        make_option('--set-size', action='store', dest='set_size',
+            type='int', default=20,
+            help='Number of entries fetched by the set/ urls. Defaults to '
+                 '20.'),
+        make_option('--json', action='store_true', dest='json',
+            default=False,
+            help='Output the results as JSON, to compare runs.'),
+    )
+    help = ('Runs the benchmarks of ExtendedModelResource. Runs all of '
+            'them if no name is given. Available benchmarks: %s.' %
+            ', '.join(sorted(BENCHMARKS)))
+
+    def handle(self, *names, **options):
+        iterations = options['iterations']
+        volumes = {
+            'users': options['users'],
+            'entries': options['entries'],
+            'set_size': options['set_size'],
+        }
+
+        for name in names:
+            if name not in BENCHMARKS:
+                raise CommandError("Unknown benchmark '%s'." % name)
+
+        results = []
+        for name in names or sorted(BENCHMARKS):
+            with transaction.commit_manually():
+                try:
+                    benchmark_results = BENCHMARKS[name](iterations,
+                                                         **volumes)
+                finally:
+                    transaction.rollback()
+
+            for label, measures in benchmark_results:
+                results.append(dict(measures, benchmark=name, label=label))
+                if not options['json']:
+                    self.stdout.write(self.format_measures(name, label,
+                                                           measures))
+
+        if options['json']:
+            self.stdout.write(simplejson.dumps(dict(volumes,
+                                                    results=results),
+                                               indent=2, sort_keys=True) +
+                              '\n')
+
+    def format_measures(self, name, label, measures):
+        if 'allocated_kb' in measures:
+            memory = '%.1f KB allocated' % measures['allocated_kb']
+        else:
+            memory = '+%d KB max RSS' % measures['max_rss_growth_kb']
+
+        return ('%s %s: %.1f us/call (p50 %.1f, p90 %.1f, p99 %.1f), '
+                '%.1f queries/call, %s\n' % (
+                    name, label, measures['mean'] * 1e6,
+                    measures['p50'] * 1e6, measures['p90'] * 1e6,
+                    measures['p99'] * 1e6, measures['queries'], memory))
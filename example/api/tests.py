@@ -4,8 +4,42 @@ when you run "manage.py test".
 
 Replace this with more appropriate tests for your application.
 """
+from datetime import timedelta
+from urlparse import parse_qs
 
-from django.test import TestCase
+from django.conf.urls import url
+from django.contrib.auth.models import User
+from django.core.exceptions import MultipleObjectsReturned
+from django.utils import simplejson
+from django.core.urlresolvers import RegexURLResolver, NoReverseMatch, \
+    Resolver404, clear_url_caches, resolve, reverse, set_script_prefix
+from django.db.models.signals import pre_delete
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase
+from django.test.client import RequestFactory
+
+from tastypie import fields
+from tastypie.api import Api
+from tastypie.authorization import Authorization
+from tastypie.bundle import Bundle
+from tastypie.exceptions import NotFound
+from tastypie.validation import Validation
+
+from extendedmodelresource import ExtendedModelResource
+from extendedmodelresource.cache import ObjectCache, UriResolverCache
+from extendedmodelresource.extendedmodelresource import copy_options, \
+    authorization_hooks, RESERVED_KWARGS
+from extendedmodelresource.fields import ToManyField
+from extendedmodelresource.instrumentation import InstrumentationCollector, \
+    NoInstrumentation
+from extendedmodelresource.paginator import KeysetPaginator
+from extendedmodelresource.test import CaptureQueries, QueryBudgetMixin, \
+    ResourceClientMixin, get_resource_routes
+
+from api.benchmarks import endpoints, reserved_kwargs
+from api.models import Entry, EntryInfo
+from api.resources import UserResource, EntryResource
+from api.urls import v1_api
 
 
 class SimpleTest(TestCase):
@@ -14,3 +48,2033 @@ class SimpleTest(TestCase):
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+class SingleObjectFetchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='hawking')
+        for i in range(10):
+            Entry.objects.create(user=self.user, title='Entry %d' % i,
+                                 body='Body %d' % i)
+
+        self.user_resource = UserResource()
+        self.entry_resource = EntryResource()
+
+    def assertBoundedFetch(self, captured):
+        self.assertEqual(len(captured.queries), 1)
+        self.assertTrue('LIMIT 2' in captured.queries[0])
+
+    def test_obj_get(self):
+        entry = Entry.objects.filter(user=self.user)[0]
+        with CaptureQueries() as captured:
+            self.assertEqual(self.entry_resource.obj_get(pk=entry.pk), entry)
+        self.assertBoundedFetch(captured)
+
+    def test_obj_get_does_not_exist(self):
+        with CaptureQueries() as captured:
+            self.assertRaises(Entry.DoesNotExist,
+                              self.entry_resource.obj_get, pk=0)
+        self.assertBoundedFetch(captured)
+
+    def test_obj_get_multiple_objects(self):
+        with CaptureQueries() as captured:
+            self.assertRaises(MultipleObjectsReturned,
+                              self.entry_resource.obj_get, user=self.user)
+        self.assertBoundedFetch(captured)
+
+    def test_obj_get_nested(self):
+        with CaptureQueries() as captured:
+            self.assertRaises(MultipleObjectsReturned,
+                              self.entry_resource.obj_get,
+                              nested_name='entries',
+                              parent_resource=self.user_resource,
+                              parent_object=self.user,
+                              user__id=self.user.pk)
+        self.assertBoundedFetch(captured)
+
+    def test_obj_get_no_auth_check(self):
+        with CaptureQueries() as captured:
+            self.assertRaises(MultipleObjectsReturned,
+                              self.entry_resource.obj_get_no_auth_check,
+                              user=self.user)
+        self.assertBoundedFetch(captured)
+
+    def test_parent_obj_get(self):
+        with CaptureQueries() as captured:
+            self.assertEqual(self.user_resource.parent_obj_get(
+                                api_name='v1', resource_name='user',
+                                pk=self.user.pk), self.user)
+        self.assertBoundedFetch(captured)
+
+    def test_get_nested_via_uri(self):
+        entry = Entry.objects.filter(user=self.user)[0]
+        uri = '/api/v1/entry/%s/' % entry.pk
+        with CaptureQueries() as captured:
+            self.assertEqual(self.entry_resource.get_nested_via_uri(uri,
+                                self.user_resource, self.user, 'entries'),
+                             entry)
+        self.assertBoundedFetch(captured)
+
+
+class NestedResourcePoolTest(TestCase):
+    def test_instance_is_reused(self):
+        user_resource = UserResource(api_name='v1')
+        nested_resource = user_resource.get_nested_resource('entries')
+
+        self.assertTrue(isinstance(nested_resource, EntryResource))
+        self.assertTrue(
+                user_resource.get_nested_resource('entries') is nested_resource)
+
+    def test_one_instance_per_api_name(self):
+        user_resource = UserResource(api_name='v1')
+        nested_resource = user_resource.get_nested_resource('entries')
+        self.assertEqual(nested_resource._meta.api_name, 'v1')
+
+        user_resource._meta = copy_options(user_resource._meta)
+        user_resource._meta.api_name = 'v2'
+        other_nested_resource = user_resource.get_nested_resource('entries')
+
+        self.assertFalse(other_nested_resource is nested_resource)
+        self.assertEqual(other_nested_resource._meta.api_name, 'v2')
+
+    def test_shared_options_are_not_mutated(self):
+        entry_resource = EntryResource(api_name='v1')
+
+        user_resource = UserResource(api_name='v1')
+        user_resource._meta = copy_options(user_resource._meta)
+        user_resource._meta.api_name = 'v2'
+        user_resource.get_nested_resource('entries')
+
+        self.assertEqual(entry_resource._meta.api_name, 'v1')
+        self.assertEqual(EntryResource._meta.api_name, 'v1')
+
+
+class CompiledEntryResource(ExtendedModelResource):
+    class Meta:
+        queryset = Entry.objects.all()
+        resource_name = 'entry'
+        compiled_detail_urls = True
+
+    class Nested:
+        entryinfo = fields.OneToManyField('api.resources.EntryInfoResource',
+                                          'entryinfo')
+
+    def detail_actions(self):
+        return [
+            url(r"^show_schema/$", self.wrap_view('get_schema'),
+                name="api_get_schema"),
+            url(r"^(?:full_)?schema/?$", self.wrap_view('get_schema'),
+                name="api_get_full_schema"),
+        ]
+
+
+class CountingCompiledEntryResource(CompiledEntryResource):
+    """
+    Counts the calls to the views from ``wrap_view``.
+    """
+    wrapped_calls = 0
+
+    def wrap_view(self, view):
+        wrapper = super(CountingCompiledEntryResource, self).wrap_view(view)
+
+        def counting_wrapper(request, *args, **kwargs):
+            CountingCompiledEntryResource.wrapped_calls += 1
+            return wrapper(request, *args, **kwargs)
+
+        return counting_wrapper
+
+
+class CompiledDetailUrlsTest(TestCase):
+    def setUp(self):
+        api = Api(api_name='v1')
+        api.register(CompiledEntryResource())
+        self.resolver = RegexURLResolver(r'^/api/', api.urls)
+
+        entry_info = EntryInfo.objects.create(somefield='Some field')
+        self.entry = Entry.objects.create(user=User.objects.get(pk=2),
+                                          title='Title', body='Body',
+                                          entryinfo=entry_info)
+
+    def get(self, path):
+        match = self.resolver.resolve(path)
+        return match.func(RequestFactory().get(path), *match.args,
+                          **match.kwargs)
+
+    def test_single_nested_url(self):
+        nested_urls = CompiledEntryResource().nested_urls()
+        self.assertEqual(len(nested_urls), 1)
+
+    def test_nested(self):
+        response = self.get('/api/v1/entry/%s/entryinfo/' % self.entry.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue('Some field' in response.content)
+
+    def test_detail_action(self):
+        response = self.get('/api/v1/entry/%s/show_schema/' % self.entry.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue('allowed_detail_http_methods' in response.content)
+
+    def test_detail_action_not_compiled(self):
+        response = self.get('/api/v1/entry/%s/full_schema' % self.entry.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue('allowed_detail_http_methods' in response.content)
+
+    def test_dispatch_without_urls(self):
+        resource = CompiledEntryResource(api_name='v1')
+        response = resource.dispatch_detail_segment(RequestFactory().get('/'),
+                        resource_name='entry', pk=str(self.entry.pk),
+                        nested_name='entryinfo')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue('Some field' in response.content)
+
+    def test_wrapped_once(self):
+        api = Api(api_name='v1')
+        api.register(CountingCompiledEntryResource())
+        self.resolver = RegexURLResolver(r'^/api/', api.urls)
+
+        for segment in ('show_schema', 'entryinfo'):
+            CountingCompiledEntryResource.wrapped_calls = 0
+            response = self.get('/api/v1/entry/%s/%s/' % (self.entry.pk,
+                                                          segment))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(CountingCompiledEntryResource.wrapped_calls, 1)
+
+    def test_reverse(self):
+        kwargs = {'api_name': 'v1', 'resource_name': 'entry',
+                  'pk': self.entry.pk}
+        for nested_name in ('entryinfo', 'show_schema'):
+            kwargs['nested_name'] = nested_name
+            self.assertEqual(self.resolver.reverse('api_dispatch_nested',
+                                                   **kwargs),
+                             'v1/entry/%s/%s/' % (self.entry.pk, nested_name))
+
+        kwargs['nested_name'] = 'unknown'
+        self.assertRaises(NoReverseMatch, self.resolver.reverse,
+                          'api_dispatch_nested', **kwargs)
+
+
+class ObjectCacheTest(TestCase):
+    def test_max_entries(self):
+        cache = ObjectCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_timeout(self):
+        cache = ObjectCache(timeout=60)
+        cache.set('a', 1)
+        cache.set('b', 2, timeout=-1)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('b'), None)
+
+    def test_versions(self):
+        cache = ObjectCache()
+        entry_version = cache.get_version(Entry)
+        user_version = cache.get_version(User)
+
+        cache.invalidate(Entry)
+        self.assertEqual(cache.get_version(Entry), entry_version + 1)
+        self.assertEqual(cache.get_version(User), user_version)
+
+    def test_versions_shared(self):
+        cache = ObjectCache()
+        version = cache.get_version(Entry)
+
+        ObjectCache().invalidate(Entry)
+        self.assertEqual(cache.get_version(Entry), version + 1)
+
+
+class ParentAuthorization(Authorization):
+    allowed = True
+
+    def is_authorized_parent(self, request, parent_object):
+        return self.allowed
+
+
+class RevocableAuthorization(Authorization):
+    allowed = True
+
+    def is_authorized(self, request, object=None):
+        return self.allowed
+
+    def apply_limits(self, request, object_list):
+        if self.allowed:
+            return object_list
+        return object_list.none()
+
+
+class CachedObjectGetTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.entry = Entry.objects.create(user=self.user, title='Title',
+                                          body='Body')
+
+        self.entry_resource = EntryResource(api_name='v1')
+        self.entry_resource._meta = copy_options(self.entry_resource._meta)
+        self.entry_resource._meta.cache = ObjectCache()
+
+        self.user_resource = UserResource(api_name='v1')
+        self.user_resource._meta = copy_options(self.user_resource._meta)
+        self.user_resource._meta.cache = ObjectCache()
+        self.user_resource._meta.authorization = ParentAuthorization()
+
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+
+    def test_cached_obj_get(self):
+        with self.assertNumQueries(1):
+            self.entry_resource.cached_obj_get(self.request, pk=self.entry.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.entry_resource.cached_obj_get(self.request,
+                                                    pk=self.entry.pk),
+                             self.entry)
+
+    def test_authorization_scope(self):
+        self.entry_resource.cached_obj_get(self.request, pk=self.entry.pk)
+
+        other_request = RequestFactory().get('/')
+        other_request.user = User.objects.get(pk=1)
+        with self.assertNumQueries(1):
+            self.entry_resource.cached_obj_get(other_request,
+                                               pk=self.entry.pk)
+
+    def test_nested_key(self):
+        self.entry_resource.cached_obj_get(self.request, pk=self.entry.pk)
+
+        with self.assertNumQueries(1):
+            self.entry_resource.cached_obj_get(self.request,
+                                               pk=self.entry.pk,
+                                               nested_name='entries',
+                                               parent_resource=self.user_resource,
+                                               parent_object=self.user)
+
+    def test_invalidated_on_update(self):
+        self.entry_resource.cached_obj_get(self.request, pk=self.entry.pk)
+
+        bundle = self.entry_resource.build_bundle(obj=self.entry,
+                                                  request=self.request)
+        bundle = self.entry_resource.full_dehydrate(bundle)
+        bundle.data['title'] = 'New title'
+        self.entry_resource.obj_update(bundle, self.request, pk=self.entry.pk)
+
+        entry = self.entry_resource.cached_obj_get(self.request,
+                                                   pk=self.entry.pk)
+        self.assertEqual(entry.title, 'New title')
+
+    def test_authorization_on_hit(self):
+        authorization = RevocableAuthorization()
+        self.entry_resource._meta.authorization = authorization
+        self.entry_resource.cached_obj_get(self.request, pk=self.entry.pk)
+
+        authorization.allowed = False
+        self.assertRaises(Entry.DoesNotExist,
+                          self.entry_resource.cached_obj_get,
+                          self.request, pk=self.entry.pk)
+
+    def test_nested_authorization_on_hit(self):
+        authorization = ParentAuthorization()
+        authorization.is_authorized_nested_entries = \
+            lambda request, parent_object, object: authorization.allowed
+        self.user_resource._meta.authorization = authorization
+        kwargs = {'pk': self.entry.pk, 'nested_name': 'entries',
+                  'parent_resource': self.user_resource,
+                  'parent_object': self.user}
+        self.entry_resource.cached_obj_get(self.request, **kwargs)
+
+        authorization.allowed = False
+        with self.assertNumQueries(1):
+            self.entry_resource.cached_obj_get(self.request, **kwargs)
+
+    def test_invalidated_by_other_resource(self):
+        self.entry_resource.cached_obj_get(self.request, pk=self.entry.pk)
+
+        other_resource = EntryResource(api_name='v1')
+        other_resource._meta = copy_options(other_resource._meta)
+        other_resource._meta.cache = ObjectCache()
+        bundle = other_resource.build_bundle(obj=self.entry,
+                                             request=self.request)
+        bundle = other_resource.full_dehydrate(bundle)
+        bundle.data['title'] = 'New title'
+        other_resource.obj_update(bundle, self.request, pk=self.entry.pk)
+
+        entry = self.entry_resource.cached_obj_get(self.request,
+                                                   pk=self.entry.pk)
+        self.assertEqual(entry.title, 'New title')
+
+    def test_invalidated_on_delete(self):
+        self.entry_resource.cached_obj_get(self.request, pk=self.entry.pk)
+        self.entry_resource.obj_delete(self.request, pk=self.entry.pk)
+
+        self.assertRaises(Entry.DoesNotExist,
+                          self.entry_resource.cached_obj_get,
+                          self.request, pk=self.entry.pk)
+
+    def test_invalidated_on_delete_list(self):
+        self.entry_resource.cached_obj_get(self.request, pk=self.entry.pk)
+        self.entry_resource.obj_delete_list(self.request, user=self.user)
+
+        self.assertRaises(Entry.DoesNotExist,
+                          self.entry_resource.cached_obj_get,
+                          self.request, pk=self.entry.pk)
+
+    def test_parent_authorization_on_hit(self):
+        kwargs = {'api_name': 'v1', 'resource_name': 'user',
+                  'pk': self.user.pk}
+        self.user_resource.parent_cached_obj_get(self.request, **kwargs)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.user_resource.parent_cached_obj_get(
+                                    self.request, **kwargs), self.user)
+
+            self.user_resource._meta.authorization.allowed = False
+            self.assertRaises(User.DoesNotExist,
+                              self.user_resource.parent_cached_obj_get,
+                              self.request, **kwargs)
+
+
+class OwnEntriesAuthorization(Authorization):
+    def apply_limits_nested_entries(self, request, parent_object,
+                                    object_list):
+        return object_list.filter(user=parent_object)
+
+
+class GetMultipleViaUriTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.entries = [Entry.objects.create(user=self.user,
+                                             title='Entry %d' % i,
+                                             body='Body %d' % i)
+                        for i in range(5)]
+        self.other_entry = Entry.objects.create(user=User.objects.get(pk=1),
+                                                title='Other', body='Other')
+
+        self.entry_resource = EntryResource(api_name='v1')
+
+    def uri(self, entry):
+        return '/api/v1/entry/%s/' % entry.pk
+
+    def test_objects_in_order(self):
+        entries = list(reversed(self.entries)) + [self.entries[0]]
+        with self.assertNumQueries(1):
+            objects, not_found = self.entry_resource.get_multiple_via_uri(
+                                    [self.uri(entry) for entry in entries])
+
+        self.assertEqual(objects, entries)
+        self.assertEqual(not_found, [])
+
+    def test_not_found(self):
+        uris = [self.uri(self.entries[0]), '/api/v1/entry/0/',
+                '/api/v1/user/2/', '/not/an/api/uri/',
+                self.uri(self.entries[1])]
+        objects, not_found = self.entry_resource.get_multiple_via_uri(uris)
+
+        self.assertEqual(objects, self.entries[:2])
+        self.assertEqual(not_found, uris[1:4])
+
+    def test_converted_identifier(self):
+        uris = ['/api/v1/entry/0%s/' % self.entries[0].pk,
+                self.uri(self.entries[0])]
+        objects, not_found = self.entry_resource.get_multiple_via_uri(uris)
+
+        self.assertEqual(objects, [self.entries[0]] * 2)
+        self.assertEqual(not_found, [])
+
+    def test_nested_authorization(self):
+        user_resource = UserResource(api_name='v1')
+        user_resource._meta = copy_options(user_resource._meta)
+        user_resource._meta.authorization = OwnEntriesAuthorization()
+
+        uris = [self.uri(self.entries[0]), self.uri(self.other_entry)]
+        objects, not_found = self.entry_resource.get_multiple_via_uri(uris,
+                                    nested_name='entries',
+                                    parent_resource=user_resource,
+                                    parent_object=self.user)
+
+        self.assertEqual(objects, self.entries[:1])
+        self.assertEqual(not_found, uris[1:])
+
+    def test_mismatched_type(self):
+        user_by_name_uri = '/api/v1/userbyname/admin/'
+        self.assertEqual(UserResource().get_multiple_via_uri(
+                            ['/api/v1/user/2/', '/api/v1/user/x/']),
+                         ([self.user], ['/api/v1/user/x/']))
+        self.assertEqual(
+            UserResource().get_multiple_via_uri([user_by_name_uri]),
+            ([], [user_by_name_uri]))
+
+    def test_to_many_field(self):
+        users = list(User.objects.all())
+        field = ToManyField(UserResource, 'users')
+        field.contribute_to_class(EntryResource, 'users')
+        bundle = Bundle(obj=self.entries[0], data={
+            'users': ['/api/v1/user/%s/' % user.pk for user in users]})
+
+        with self.assertNumQueries(1):
+            bundles = field.hydrate_m2m(bundle)
+
+        self.assertEqual([fk_bundle.obj for fk_bundle in bundles], users)
+
+
+class UriResolverCacheTest(TestCase):
+    def setUp(self):
+        self.cache = UriResolverCache(max_entries=2)
+
+    def tearDown(self):
+        set_script_prefix('/')
+
+    def test_hits_and_misses(self):
+        match = self.cache.resolve('/api/v1/user/1/')
+        self.assertEqual(match.kwargs, {'api_name': 'v1',
+                                        'resource_name': 'user', 'pk': '1'})
+        self.assertTrue(self.cache.resolve('/api/v1/user/1/') is match)
+
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_max_entries(self):
+        self.cache.resolve('/api/v1/user/1/')
+        self.cache.resolve('/api/v1/user/2/')
+        self.cache.resolve('/api/v1/user/1/')
+        self.cache.resolve('/api/v1/user/3/')
+        self.cache.resolve('/api/v1/user/1/')
+        self.cache.resolve('/api/v1/user/2/')
+
+        self.assertEqual(self.cache.hits, 2)
+        self.assertEqual(self.cache.misses, 4)
+
+    def test_not_found(self):
+        self.assertRaises(Resolver404, self.cache.resolve, '/not/an/api/uri/')
+
+    def test_script_prefix(self):
+        self.cache.resolve('/api/v1/user/1/')
+
+        set_script_prefix('/prefix/')
+        match = self.cache.resolve('/prefix/api/v1/user/1/')
+        self.assertEqual(match.kwargs['pk'], '1')
+        self.cache.resolve('/api/v1/user/1/')
+
+        self.assertEqual(self.cache.hits, 0)
+        self.assertEqual(self.cache.misses, 3)
+
+    def test_cleared_when_urlconfs_are_reloaded(self):
+        self.cache.resolve('/api/v1/user/1/')
+        clear_url_caches()
+        self.cache.resolve('/api/v1/user/1/')
+
+        self.assertEqual(self.cache.hits, 0)
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_get_via_uri_resolver(self):
+        kwargs = UserResource().get_via_uri_resolver('/api/v1/user/1/')
+        kwargs['pk'] = '2'
+
+        kwargs = UserResource().get_via_uri_resolver('/api/v1/user/1/')
+        self.assertEqual(kwargs['pk'], '1')
+
+
+class EntriesAuthorization(Authorization):
+    def is_authorized_nested_entries(self, request, parent_object,
+                                     object=None):
+        return True
+
+    def apply_limits_nested_entries(self, request, parent_object,
+                                    object_list):
+        return object_list
+
+
+class GetattrAuthorization(Authorization):
+    def __getattr__(self, name):
+        if name == 'apply_limits_nested_entries':
+            return lambda request, parent_object, object_list: []
+        raise AttributeError(name)
+
+
+class StaticAuthorization(Authorization):
+    @staticmethod
+    def is_authorized_parent(request, parent_object):
+        return False
+
+
+class AuthorizedUserResource(ExtendedModelResource):
+    class Meta:
+        queryset = User.objects.all()
+        resource_name = 'user'
+        authorization = EntriesAuthorization()
+
+    class Nested:
+        entries = fields.ToManyField('api.resources.EntryResource', 'entries')
+        entryinfo = fields.ToManyField('api.resources.EntryInfoResource',
+                                       'entryinfo')
+
+
+class AuthorizationHooksTest(TestCase):
+    def test_looked_up_on_class_creation(self):
+        for hook_name in ('is_authorized_nested', 'apply_limits_nested'):
+            for nested_name in ('entries', 'entryinfo'):
+                key = (EntriesAuthorization, hook_name, nested_name)
+                self.assertTrue(key in authorization_hooks._hooks)
+
+    def test_get(self):
+        authorization = EntriesAuthorization()
+        self.assertEqual(authorization_hooks.get(authorization,
+                            'apply_limits_nested', 'entries'),
+                         authorization.apply_limits_nested_entries)
+        self.assertEqual(authorization_hooks.get(authorization,
+                            'apply_limits_nested', 'entryinfo'), None)
+        self.assertEqual(authorization_hooks.get(authorization,
+                            'is_authorized_parent'), None)
+
+    def test_instance_hook(self):
+        authorization = EntriesAuthorization()
+        self.assertEqual(authorization_hooks.get(authorization,
+                            'is_authorized_parent'), None)
+
+        hook = lambda request, parent_object: False
+        authorization.is_authorized_parent = hook
+        self.assertEqual(authorization_hooks.get(authorization,
+                            'is_authorized_parent'), hook)
+        self.assertEqual(authorization_hooks.get(EntriesAuthorization(),
+                            'is_authorized_parent'), None)
+
+    def test_getattr_hook(self):
+        authorization = GetattrAuthorization()
+        hook = authorization_hooks.get(authorization, 'apply_limits_nested',
+                                       'entries')
+
+        self.assertEqual(hook(None, None, Entry.objects.all()), [])
+        self.assertEqual(authorization_hooks.get(authorization,
+                            'apply_limits_nested', 'entryinfo'), None)
+
+    def test_static_hook(self):
+        hook = authorization_hooks.get(StaticAuthorization(),
+                                       'is_authorized_parent')
+        self.assertFalse(hook(None, None))
+
+    def test_instance_hook_limits_nested_list(self):
+        user = User.objects.get(pk=2)
+        resource = UserResource(api_name='v1')
+        resource._meta = copy_options(resource._meta)
+        resource._meta.authorization = Authorization()
+        resource._meta.authorization.apply_limits_nested_entries = \
+            lambda request, parent_object, object_list: object_list.none()
+
+        request = RequestFactory().get('/', {'format': 'json'})
+        response = resource.dispatch_nested(request, resource_name='user',
+                                            pk=str(user.pk),
+                                            nested_name='entries')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(simplejson.loads(response.content)['objects'], [])
+
+    def test_nested_authorization_hooks(self):
+        self.assertEqual(AuthorizedUserResource().nested_authorization_hooks(),
+                         {'entries': ['is_authorized_nested_entries',
+                                      'apply_limits_nested_entries']})
+
+
+class CountingValidation(Validation):
+    calls = 0
+
+    def is_valid(self, bundle, request=None):
+        CountingValidation.calls += 1
+        return {}
+
+
+class NestedListWriteTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='curie')
+        self.other_user = User.objects.get(pk=1)
+        self.old_entry = Entry.objects.create(user=self.user, title='Old',
+                                              body='Old')
+        self.url = '/api/v1/user/%s/entries/' % self.user.pk
+
+        # The options of the nested resources are copies, so they can be
+        # changed without affecting other tests.
+        self.nested_options = v1_api._registry['user'].get_nested_resource(
+                                                            'entries')._meta
+        self.old_nested_bulk_create = self.nested_options.nested_bulk_create
+
+    def tearDown(self):
+        self.nested_options.nested_bulk_create = self.old_nested_bulk_create
+
+    def send(self, method, data):
+        return getattr(self.client, method)(self.url,
+                                            data=simplejson.dumps(data),
+                                            content_type='application/json')
+
+    def test_post_single_object(self):
+        response = self.send('post', {'title': 'New', 'body': 'Body'})
+        self.assertEqual(response.status_code, 201)
+
+        entry = Entry.objects.get(title='New')
+        self.assertEqual(entry.user, self.user)
+        self.assertEqual(entry.slug, 'new')
+        self.assertEqual(response['Location'],
+                         'http://testserver/api/v1/entry/%s/' % entry.pk)
+
+    def test_post_validated_once(self):
+        old_validation = self.nested_options.validation
+        self.nested_options.validation = CountingValidation()
+        try:
+            response = self.send('post', {'title': 'New', 'body': 'Body'})
+        finally:
+            self.nested_options.validation = old_validation
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(CountingValidation.calls, 1)
+
+    def test_post_objects_linked_to_parent(self):
+        other_user_uri = '/api/v1/user/%s/' % self.other_user.pk
+        response = self.send('post', {'objects': [
+            {'title': 'First', 'body': 'Body'},
+            {'title': 'Second', 'body': 'Body', 'user': other_user_uri},
+        ]})
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(
+            sorted(self.user.entries.values_list('title', flat=True)),
+            ['First', 'Old', 'Second'])
+
+    def test_post_bulk_create(self):
+        self.nested_options.nested_bulk_create = True
+        data = {'objects': [{'title': 'Entry %d' % i, 'body': 'Body',
+                             'slug': 'entry-%d' % i} for i in range(20)]}
+
+        with CaptureQueries() as captured:
+            response = self.send('post', data)
+        self.assertEqual(response.status_code, 201)
+
+        inserts = [sql for sql in captured.queries if sql.startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.user.entries.count(), 21)
+
+    def test_post_bulk_create_response(self):
+        self.nested_options.nested_bulk_create = True
+        old_always_return_data = self.nested_options.always_return_data
+        self.nested_options.always_return_data = True
+        try:
+            response = self.send('post', {'title': 'New', 'body': 'Body',
+                                          'slug': 'new'})
+        finally:
+            self.nested_options.always_return_data = old_always_return_data
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('/api/v1/entry/', response.get('Location', ''))
+        self.assertNotIn('None', response.get('Location', ''))
+        self.assertEqual(response.content, '')
+        self.assertTrue(self.user.entries.filter(title='New').exists())
+
+    def test_put_replaces_children(self):
+        other_entry = Entry.objects.create(user=self.other_user,
+                                           title='Other', body='Other')
+
+        response = self.send('put', {'objects': [
+            {'title': 'First', 'body': 'Body'},
+            {'title': 'Second', 'body': 'Body'},
+        ]})
+        self.assertEqual(response.status_code, 202)
+
+        self.assertEqual(
+            sorted(self.user.entries.values_list('title', flat=True)),
+            ['First', 'Second'])
+        self.assertTrue(Entry.objects.filter(pk=other_entry.pk).exists())
+
+    def test_put_requires_objects(self):
+        response = self.send('put', {'title': 'First', 'body': 'Body'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.user.entries.count(), 1)
+
+
+class NestedListWriteTransactionTest(TransactionTestCase):
+    def test_post_invalid_rolls_back(self):
+        user = User.objects.get(pk=2)
+        response = self.client.post('/api/v1/user/%s/entries/' % user.pk,
+            data=simplejson.dumps({'objects': [
+                {'title': 'First', 'body': 'Body'},
+                {'title': 'Second', 'body': 'Body', 'pub_date': 'not a date'},
+            ]}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(user.entries.count(), 1)
+
+
+class StreamingListTest(ResourceClientMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        for i in range(5):
+            Entry.objects.create(user=self.user, title='Entry %d' % i,
+                                 body='Body')
+        self.nested_options = \
+            v1_api._registry['user'].get_nested_resource('entries')._meta
+
+    def tearDown(self):
+        self.nested_options.streaming_list = False
+        self.nested_options.streaming_chunk_size = 100
+
+    def test_nested_list(self):
+        url = '/api/v1/user/%s/entries/' % self.user.pk
+        expected, queries = self.get_data(url)
+        self.assertEqual(len(expected['objects']), 6)
+
+        self.nested_options.streaming_list = True
+        self.nested_options.streaming_chunk_size = 4
+        self.assertEqual(self.get_data(url)[0], expected)
+
+    def test_empty_list(self):
+        self.nested_options.streaming_list = True
+        data, queries = self.get_data('/api/v1/user/1/entries/')
+
+        self.assertEqual(data['objects'], [])
+        self.assertEqual(data['meta']['total_count'], 0)
+
+    def test_only_json_is_streamed(self):
+        self.nested_options.streaming_list = True
+        response = self.client.get('/api/v1/user/%s/entries/' % self.user.pk,
+                                   {'format': 'jsonp', 'callback': 'cb'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content.startswith('cb('))
+
+
+class EntryPaginator(KeysetPaginator):
+    ordering = ('-pub_date', 'pk')
+
+
+class KeysetPaginatorTest(ResourceClientMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        pub_date = Entry.objects.get(pk=1).pub_date
+        # Some entries share their pub_date, so pk breaks the ties.
+        for i in range(6):
+            Entry.objects.create(user=self.user, title='Entry %d' % i,
+                                 body='Body',
+                                 pub_date=pub_date - timedelta(days=i // 2))
+        self.nested_options = \
+            v1_api._registry['user'].get_nested_resource('entries')._meta
+        self.old_paginator_class = self.nested_options.paginator_class
+        self.nested_options.paginator_class = EntryPaginator
+
+    def tearDown(self):
+        self.nested_options.paginator_class = self.old_paginator_class
+
+    def test_scroll_nested_list(self):
+        expected = [entry.pk for entry in
+                    self.user.entries.order_by('-pub_date', 'pk')]
+
+        pks = []
+        queries = []
+        url = '/api/v1/user/%s/entries/?limit=2' % self.user.pk
+        while url:
+            path, query = url.split('?')
+            data, captured = self.get_data(path, **dict(
+                    (k, v[0]) for k, v in parse_qs(query).items()))
+            queries.extend(captured)
+            self.assertEqual(data['meta']['limit'], 2)
+            self.assertFalse('total_count' in data['meta'])
+            pks.extend(int(entry['id']) for entry in data['objects'])
+            url = data['meta']['next']
+
+        self.assertEqual(pks, expected)
+        for sql in queries:
+            self.assertFalse('OFFSET' in sql or 'COUNT(' in sql, sql)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            '/api/v1/user/%s/entries/' % self.user.pk,
+            {'format': 'json', 'cursor': 'not a cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_order_by(self):
+        old_ordering = self.nested_options.ordering
+        self.nested_options.ordering = ['title']
+        try:
+            response = self.client.get(
+                '/api/v1/user/%s/entries/' % self.user.pk,
+                {'format': 'json', 'order_by': 'title'})
+        finally:
+            self.nested_options.ordering = old_ordering
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue('order_by' in response.content)
+
+    def test_no_limit(self):
+        data, queries = self.get_data('/api/v1/user/%s/entries/' %
+                                      self.user.pk, limit=0)
+
+        self.assertEqual(len(data['objects']), 7)
+        self.assertFalse('next' in data['meta'])
+
+
+class UserWithEntriesResource(ExtendedModelResource):
+    entries = fields.ToManyField(EntryResource, 'entries')
+
+    class Meta:
+        queryset = User.objects.all()
+        resource_name = 'userwithentries'
+        api_name = 'v1'
+
+
+class UserWithoutPrefetchResource(UserWithEntriesResource):
+    def get_prefetch_related(self, request):
+        return []
+
+
+class RelatedLookupsTest(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/', {'format': 'json'})
+
+    def add_entries(self, count):
+        for i in range(count):
+            user = User.objects.create(username='user%d-%d' % (count, i))
+            Entry.objects.create(user=user, title='Entry', body='Body')
+
+    def count_list_queries(self, resource):
+        with CaptureQueries() as captured:
+            response = resource.get_list(self.request)
+        self.assertEqual(response.status_code, 200)
+        return len(captured.queries)
+
+    def test_planned_from_fields(self):
+        self.assertEqual(EntryResource._meta.select_related, ['user'])
+        self.assertEqual(EntryResource._meta.prefetch_related, [])
+        self.assertEqual(UserWithEntriesResource._meta.select_related, [])
+        self.assertEqual(UserWithEntriesResource._meta.prefetch_related,
+                         ['entries'])
+
+    def test_constant_queries_to_one(self):
+        resource = EntryResource()
+        self.add_entries(2)
+        queries = self.count_list_queries(resource)
+        self.add_entries(3)
+        self.assertEqual(self.count_list_queries(resource), queries)
+
+    def test_constant_queries_to_many(self):
+        resource = UserWithEntriesResource()
+        self.add_entries(2)
+        queries = self.count_list_queries(resource)
+        self.add_entries(3)
+        self.assertEqual(self.count_list_queries(resource), queries)
+
+    def test_override_per_request(self):
+        resource = UserWithoutPrefetchResource()
+        self.add_entries(2)
+        queries = self.count_list_queries(resource)
+        self.add_entries(3)
+        self.assertEqual(self.count_list_queries(resource), queries + 3)
+
+
+class NoParentUserResource(UserResource):
+    def parent_obj_get(self, request=None, **kwargs):
+        raise User.DoesNotExist()
+
+
+class NotAuthorizedParentUserResource(UserResource):
+    def is_authorized_over_parent(self, request, parent_object):
+        return False
+
+
+class NestedDispatchQueriesTest(ResourceClientMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.entry = Entry.objects.get(pk=1)
+
+    def test_to_one_fetched_with_parent(self):
+        self.entry.entryinfo = EntryInfo.objects.create(somefield='Info')
+        self.entry.save()
+
+        response, queries = self.get('/api/v1/entry/%s/entryinfo/' %
+                                     self.entry.pk)
+        self.assertEqual(simplejson.loads(response.content)['somefield'],
+                         'Info')
+        self.assertEqual(len(queries), 1)
+
+    def test_to_one_missing(self):
+        self.get('/api/v1/entry/%s/entryinfo/' % self.entry.pk, 404)
+
+    def test_to_many_without_parent(self):
+        response, queries = self.get('/api/v1/user/%s/entries/' %
+                                     self.user.pk)
+        self.assertEqual(len(simplejson.loads(response.content)['objects']),
+                         1)
+        # The count and the page of entries.
+        self.assertEqual(len(queries), 2)
+        self.assertFalse([sql for sql in queries
+                          if sql.startswith('SELECT "auth_user"')])
+
+    def test_to_many_related_manager_filters(self):
+        # The filters linking the entries to the user (``user__id``) are not
+        # allowed by the ``filtering`` of the resource, so they must not go
+        # through ``build_filters``, which would make the request a 400.
+        Entry.objects.create(user=User.objects.get(pk=1), title='Other',
+                             body='Body')
+        response, queries = self.get('/api/v1/user/%s/entries/' %
+                                     self.user.pk)
+        objects = simplejson.loads(response.content)['objects']
+        self.assertEqual([entry['id'] for entry in objects],
+                         [str(self.entry.pk)])
+
+    def test_to_many_empty(self):
+        response, queries = self.get('/api/v1/user/1/entries/')
+        self.assertEqual(simplejson.loads(response.content)['objects'], [])
+
+    def test_to_many_missing_parent(self):
+        self.get('/api/v1/user/999/entries/', 404)
+
+    def test_parent_needed_by_authorization(self):
+        user_resource = AuthorizedUserResource()
+        request = RequestFactory().get('/')
+        self.assertTrue(user_resource.nested_needs_parent_object(request,
+                                                                 'entries'))
+        self.assertFalse(UserResource().nested_needs_parent_object(request,
+                                                                  'entries'))
+
+        request = RequestFactory().post('/')
+        self.assertTrue(UserResource().nested_needs_parent_object(request,
+                                                                 'entries'))
+
+    def test_parent_needed_by_overrides(self):
+        request = RequestFactory().get('/')
+        for resource_class in (NoParentUserResource,
+                               NotAuthorizedParentUserResource):
+            self.assertTrue(resource_class().nested_needs_parent_object(
+                                                        request, 'entries'))
+
+    def test_overridden_parent_obj_get(self):
+        self.assertEqual(self.dispatch(NoParentUserResource()).status_code,
+                         404)
+
+    def test_overridden_is_authorized_over_parent(self):
+        response = self.dispatch(NotAuthorizedParentUserResource())
+        self.assertEqual(response.status_code, 404)
+
+    def dispatch(self, resource):
+        request = RequestFactory().get('/', {'format': 'json'})
+        return resource.dispatch_nested(request, resource_name='user',
+                                        pk=str(self.user.pk),
+                                        nested_name='entries')
+
+
+class PublicEntriesAuthorization(ParentAuthorization):
+    def apply_limits_nested_entries(self, request, parent_object,
+                                    object_list):
+        return object_list.filter(user=parent_object,
+                                  title__startswith='Public')
+
+
+class PublicEntriesUserResource(ExtendedModelResource):
+    class Meta:
+        queryset = User.objects.all()
+        resource_name = 'user'
+        api_name = 'v1'
+        authorization = PublicEntriesAuthorization()
+
+    class Nested:
+        entries = fields.ToManyField('api.resources.EntryResource', 'entries')
+
+
+class NestedChainTest(ResourceClientMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.entry = Entry.objects.get(pk=1)
+        self.entry.entryinfo = EntryInfo.objects.create(somefield='Info')
+        self.entry.save()
+
+    def test_reverse(self):
+        self.assertEqual(reverse('api_dispatch_nested_chain', kwargs={
+                            'api_name': 'v1', 'resource_name': 'user',
+                            'pk': 2, 'nested_name': 'entries',
+                            'nested_path': '1/entryinfo'}),
+                         '/api/v1/user/2/entries/1/entryinfo/')
+
+    def test_nested_of_nested(self):
+        response, queries = self.get('/api/v1/user/%s/entries/%s/entryinfo/' %
+                                     (self.user.pk, self.entry.pk))
+        self.assertEqual(simplejson.loads(response.content)['somefield'],
+                         'Info')
+        self.assertEqual(len(queries), 1)
+
+    def test_object_of_nested(self):
+        response, queries = self.get('/api/v1/user/%s/entries/%s/' %
+                                     (self.user.pk, self.entry.pk))
+        self.assertEqual(simplejson.loads(response.content)['resource_uri'],
+                         '/api/v1/entry/%s/' % self.entry.pk)
+        self.assertEqual(len(queries), 1)
+
+    def send(self, method, url, data=None):
+        request = RequestFactory().post(url, data=simplejson.dumps(data or {}),
+                                        content_type='application/json')
+        request.method = method
+        match = resolve(url)
+        return match.func(request, *match.args, **match.kwargs)
+
+    def test_write_object_of_nested(self):
+        other_entry = Entry.objects.create(user=self.user, title='Other',
+                                           body='Other')
+        url = '/api/v1/user/%s/entries/%s/' % (self.user.pk, self.entry.pk)
+        count = Entry.objects.count()
+
+        response = self.send('PUT', url, {
+            'title': 'Put', 'body': 'Put', 'slug': 'put',
+            'user': '/api/v1/user/%s/' % self.user.pk})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(Entry.objects.get(pk=self.entry.pk).title, 'Put')
+        self.assertEqual(Entry.objects.count(), count)
+
+        response = self.send('PATCH', url, {'title': 'Patched'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Entry.objects.get(pk=self.entry.pk).title,
+                         'Patched')
+        self.assertEqual(Entry.objects.get(pk=other_entry.pk).title, 'Other')
+
+        response = self.send('DELETE', url)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Entry.objects.filter(pk=self.entry.pk).exists())
+        self.assertTrue(Entry.objects.filter(pk=other_entry.pk).exists())
+
+    def test_write_object_of_other_parent(self):
+        url = '/api/v1/user/1/entries/%s/' % self.entry.pk
+
+        self.assertEqual(self.send('DELETE', url).status_code, 404)
+        self.assertTrue(Entry.objects.filter(pk=self.entry.pk).exists())
+
+    def test_parent_fetched_for_writes(self):
+        url = '/api/v1/user/%s/entries/%s/' % (self.user.pk, self.entry.pk)
+        with CaptureQueries() as captured:
+            self.assertEqual(self.send('DELETE', url).status_code, 204)
+
+        self.assertTrue([sql for sql in captured.queries
+                         if sql.startswith('SELECT "auth_user"')])
+
+    def test_overridden_is_authorized_over_parent(self):
+        resource = NotAuthorizedParentUserResource()
+        request = RequestFactory().delete('/')
+        response = resource.dispatch_nested_chain(request,
+                        resource_name='user', pk=str(self.user.pk),
+                        nested_name='entries', nested_path=str(self.entry.pk))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(Entry.objects.filter(pk=self.entry.pk).exists())
+
+    def test_reserved_words(self):
+        for path, url_name in [
+                ('/api/v1/user/2/entries/aggregate/', 'api_nested_aggregate'),
+                ('/api/v1/user/2/entries/set/1/',
+                 'api_nested_get_multiple'),
+                ('/api/v1/user/2/entries/aggregates/',
+                 'api_dispatch_nested_chain'),
+                ('/api/v1/user/2/entries/sets/entryinfo/',
+                 'api_dispatch_nested_chain')]:
+            self.assertEqual(resolve(path).url_name, url_name)
+
+    def test_not_nested_of_parent(self):
+        self.get('/api/v1/user/1/entries/%s/entryinfo/' % self.entry.pk, 404)
+        self.get('/api/v1/user/1/entries/%s/' % self.entry.pk, 404)
+
+    def test_invalid_path(self):
+        self.get('/api/v1/user/%s/entries/%s/nothing/' %
+                 (self.user.pk, self.entry.pk), 404)
+        self.get('/api/v1/user/%s/entries/not-an-id/entryinfo/' %
+                 self.user.pk, 404)
+
+    def test_authorization_hooks(self):
+        resource = PublicEntriesUserResource()
+        request = RequestFactory().get('/', {'format': 'json'})
+        kwargs = {'resource_name': 'user', 'pk': str(self.user.pk),
+                  'nested_name': 'entries',
+                  'nested_path': '%s/entryinfo' % self.entry.pk}
+
+        response = resource.dispatch_nested_chain(request, **kwargs.copy())
+        self.assertEqual(response.status_code, 404)
+
+        self.entry.title = 'Public entry'
+        self.entry.save()
+        response = resource.dispatch_nested_chain(request, **kwargs.copy())
+        self.assertEqual(response.status_code, 200)
+
+        resource._meta.authorization.allowed = False
+        try:
+            response = resource.dispatch_nested_chain(request, **kwargs.copy())
+            self.assertEqual(response.status_code, 404)
+        finally:
+            resource._meta.authorization.allowed = True
+
+
+class NestedAggregateTest(ResourceClientMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.first_date = Entry.objects.get(pk=1).pub_date
+        self.last_date = self.first_date + timedelta(days=2)
+        Entry.objects.create(user=self.user, title='Second', body='Body',
+                             pub_date=self.last_date)
+        self.url = '/api/v1/user/%s/entries/aggregate/' % self.user.pk
+
+    def test_count(self):
+        response, queries = self.get(self.url)
+        self.assertEqual(simplejson.loads(response.content), {'count': 2})
+        self.assertEqual(len(queries), 1)
+
+    def test_max_min(self):
+        response, queries = self.get(self.url, max='pub_date',
+                                     min=['pub_date', 'id'])
+        data = simplejson.loads(response.content)
+
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['min_id'], 1)
+        self.assertTrue(data['max_pub_date'].startswith(
+                            self.last_date.strftime('%Y-%m-%dT%H:%M:%S')))
+        self.assertTrue(data['min_pub_date'].startswith(
+                            self.first_date.strftime('%Y-%m-%dT%H:%M:%S')))
+        self.assertEqual(len(queries), 1)
+
+    def test_invalid_field(self):
+        self.get(self.url, 400, max='user')
+        self.get(self.url, 400, max='nothing')
+
+    def test_empty_and_missing_parent(self):
+        response, queries = self.get('/api/v1/user/1/entries/aggregate/')
+        self.assertEqual(simplejson.loads(response.content)['count'], 0)
+        self.get('/api/v1/user/999/entries/aggregate/', 404)
+
+    def test_authorization_limits(self):
+        resource = PublicEntriesUserResource()
+        request = RequestFactory().get('/', {'format': 'json'})
+        Entry.objects.create(user=self.user, title='Public entry',
+                             body='Body')
+
+        response = resource.dispatch_nested_aggregate(request,
+                        resource_name='user', pk=str(self.user.pk),
+                        nested_name='entries')
+        self.assertEqual(simplejson.loads(response.content), {'count': 1})
+
+    def test_to_one(self):
+        self.get('/api/v1/entry/1/entryinfo/aggregate/', 404)
+
+
+class DehydratedTitleEntryResource(ExtendedModelResource):
+    class Meta:
+        queryset = Entry.objects.all()
+        resource_name = 'entry'
+        api_name = 'v1'
+
+    def dehydrate_title(self, bundle):
+        return bundle.obj.title.upper()
+
+
+class SparseFieldsTest(ResourceClientMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.entry = Entry.objects.get(pk=1)
+
+    def test_list(self):
+        response, queries = self.get('/api/v1/entry/', fields='title')
+        objects = simplejson.loads(response.content)['objects']
+        self.assertEqual(objects, [{'title': self.entry.title}])
+
+        select = queries[-1]
+        self.assertFalse('"body"' in select)
+        self.assertFalse('auth_user' in select)
+
+    def test_detail(self):
+        response, queries = self.get('/api/v1/entry/%s/' % self.entry.pk,
+                                     fields='title,resource_uri')
+        self.assertEqual(simplejson.loads(response.content), {
+            'title': self.entry.title,
+            'resource_uri': '/api/v1/entry/%s/' % self.entry.pk,
+        })
+        self.assertEqual(len(queries), 1)
+        self.assertFalse('"body"' in queries[0])
+
+    def test_nested_list_with_relation(self):
+        response, queries = self.get('/api/v1/user/%s/entries/' %
+                                     self.user.pk, fields=['title', 'user'])
+        objects = simplejson.loads(response.content)['objects']
+        self.assertEqual(objects, [{'title': self.entry.title,
+                                    'user': '/api/v1/user/%s/' % self.user.pk}])
+
+        select = queries[-1]
+        self.assertFalse('"body"' in select)
+        self.assertTrue('auth_user' in select)
+
+    def test_unknown_field(self):
+        self.get('/api/v1/entry/', 400, fields='title,nothing')
+
+    def test_dehydrate_method(self):
+        resource = DehydratedTitleEntryResource()
+        request = RequestFactory().get('/', {'fields': 'title'})
+        self.assertEqual(resource.get_sparse_fields(request), ['title'])
+        self.assertEqual(resource.get_sparse_attributes(request), None)
+
+        with CaptureQueries() as captured:
+            data = resource.full_dehydrate(
+                        resource.build_bundle(obj=resource.obj_get(request,
+                                                        pk=self.entry.pk),
+                                              request=request),
+                        resource.get_sparse_fields(request)).data
+        self.assertEqual(data, {'title': self.entry.title.upper()})
+        self.assertTrue('"body"' in captured.queries[0])
+
+    def test_only_get(self):
+        request = RequestFactory().put('/?fields=title')
+        self.assertEqual(EntryResource().get_sparse_fields(request), None)
+
+
+class ConditionalGetTest(ResourceClientMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.entry = Entry.objects.get(pk=1)
+        self.options = [EntryResource._meta,
+            v1_api._registry['user'].get_nested_resource('entries')._meta]
+        for options in self.options:
+            options.last_modified_field = 'pub_date'
+
+    def tearDown(self):
+        for options in self.options:
+            options.last_modified_field = None
+
+    def test_detail_etag(self):
+        url = '/api/v1/entry/%s/' % self.entry.pk
+        response, queries = self.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        # Without conditional headers, the validators come from the object.
+        self.assertEqual(len(queries), 1)
+
+        response, queries = self.get(url, 304, headers={
+                                'HTTP_IF_NONE_MATCH': response['ETag']})
+        self.assertEqual(response.content, '')
+        self.assertEqual(len(queries), 1)
+        self.assertTrue('MAX(' in queries[0])
+
+    def test_detail_if_modified_since(self):
+        url = '/api/v1/entry/%s/' % self.entry.pk
+        response, queries = self.get(url)
+        last_modified = response['Last-Modified']
+
+        self.get(url, 304,
+                 headers={'HTTP_IF_MODIFIED_SINCE': last_modified})
+
+        self.entry.pub_date += timedelta(days=1)
+        self.entry.save()
+        self.get(url, 200,
+                 headers={'HTTP_IF_MODIFIED_SINCE': last_modified})
+
+    def test_detail_mismatched_type(self):
+        self.get('/api/v1/entry/x/', 404,
+                 headers={'HTTP_IF_NONE_MATCH': '"etag"'})
+
+    def test_nested_list(self):
+        url = '/api/v1/user/%s/entries/' % self.user.pk
+        response, queries = self.get(url)
+        etag = response['ETag']
+
+        response, queries = self.get(url, 304,
+                                     headers={'HTTP_IF_NONE_MATCH': etag})
+        self.assertEqual(len(queries), 1)
+
+        Entry.objects.create(user=self.user, title='New', body='Body',
+                             pub_date=self.entry.pub_date)
+        response, queries = self.get(url, 200,
+                                     headers={'HTTP_IF_NONE_MATCH': etag})
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_nested_object(self):
+        url = '/api/v1/user/%s/entries/%s/' % (self.user.pk, self.entry.pk)
+        response, queries = self.get(url)
+        self.get(url, 304, headers={'HTTP_IF_NONE_MATCH': response['ETag']})
+
+    def test_disabled(self):
+        for options in self.options:
+            options.last_modified_field = None
+
+        response, queries = self.get('/api/v1/entry/%s/' % self.entry.pk)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(len(queries), 1)
+
+
+class ResponseCacheTest(ResourceClientMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.entry = Entry.objects.get(pk=1)
+        self.entry_options = [EntryResource._meta,
+            v1_api._registry['user'].get_nested_resource('entries')._meta]
+        self.cache = ObjectCache()
+        for options in self.entry_options:
+            options.cache_responses = True
+            options.cache = self.cache
+        self.old_user_cache = UserResource._meta.cache
+        UserResource._meta.cache = self.cache
+
+    def tearDown(self):
+        for options in self.entry_options:
+            options.cache_responses = False
+            options.cache = self.old_user_cache
+        UserResource._meta.cache = self.old_user_cache
+
+    def test_detail(self):
+        url = '/api/v1/entry/%s/' % self.entry.pk
+        response, queries = self.get(url)
+        cached_response, queries = self.get(url)
+
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(len(queries), 0)
+
+        response, queries = self.get(url, fields='title')
+        self.assertEqual(simplejson.loads(response.content).keys(), ['title'])
+
+    def test_nested_list(self):
+        url = '/api/v1/user/%s/entries/' % self.user.pk
+        self.get(url)
+        response, queries = self.get(url)
+        self.assertEqual(len(queries), 0)
+
+        # Created through the nested resource.
+        self.client.post(url, data=simplejson.dumps({'title': 'New',
+                                                     'body': 'Body'}),
+                         content_type='application/json')
+        response, queries = self.get(url)
+        self.assertEqual(len(simplejson.loads(response.content)['objects']),
+                         2)
+
+    def test_invalidated_by_parent(self):
+        url = '/api/v1/user/%s/entries/' % self.user.pk
+        self.get(url)
+
+        v1_api._registry['user'].obj_delete(pk=self.user.pk)
+        self.get(url, 404)
+
+    def test_not_modified_from_cache(self):
+        for options in self.entry_options:
+            options.last_modified_field = 'pub_date'
+        try:
+            url = '/api/v1/entry/%s/' % self.entry.pk
+            response, queries = self.get(url)
+            response, queries = self.get(url, 304, headers={
+                                    'HTTP_IF_NONE_MATCH': response['ETag']})
+            self.assertEqual(len(queries), 0)
+        finally:
+            for options in self.entry_options:
+                options.last_modified_field = None
+
+
+class ConcurrentDeleteEntryResource(ExtendedModelResource):
+    """
+    Removes an entry of each chunk between the select of its primary keys
+    and the delete.
+    """
+    class Meta:
+        queryset = Entry.objects.all()
+        resource_name = 'entry'
+        authorization = Authorization()
+        bulk_delete = True
+        bulk_delete_chunk_size = 2
+
+    def delete_chunk(self, pks, using):
+        Entry.objects.filter(pk=pks[0]).delete()
+        return super(ConcurrentDeleteEntryResource, self).delete_chunk(pks,
+                                                                      using)
+
+
+class BulkDeleteTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.other_user = User.objects.get(pk=1)
+        for i in range(4):
+            Entry.objects.create(user=self.user, title='Entry %d' % i,
+                                 body='Body')
+        Entry.objects.create(user=self.other_user, title='Other',
+                             body='Body')
+        self.url = '/api/v1/user/%s/entries/' % self.user.pk
+
+        self.nested_options = \
+            v1_api._registry['user'].get_nested_resource('entries')._meta
+        self.nested_options.bulk_delete = True
+        self.nested_options.bulk_delete_chunk_size = 2
+
+        self.deleted_signals = []
+        pre_delete.connect(self.count_signal, sender=Entry)
+
+    def tearDown(self):
+        pre_delete.disconnect(self.count_signal, sender=Entry)
+        self.nested_options.bulk_delete = False
+        self.nested_options.bulk_delete_chunk_size = 500
+        self.nested_options.bulk_delete_signals = True
+
+    def count_signal(self, sender, instance, **kwargs):
+        self.deleted_signals.append(instance.pk)
+
+    def delete(self, url):
+        with CaptureQueries() as captured:
+            response = self.client.delete(url, {'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        return simplejson.loads(response.content), captured.queries
+
+    def test_nested(self):
+        data, queries = self.delete(self.url)
+
+        self.assertEqual(data, {'deleted': 5})
+        self.assertEqual(self.user.entries.count(), 0)
+        self.assertEqual(self.other_user.entries.count(), 1)
+        self.assertEqual(len(self.deleted_signals), 5)
+
+        deletes = [sql for sql in queries if sql.startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+
+    def test_without_signals(self):
+        self.nested_options.bulk_delete_signals = False
+        data, queries = self.delete(self.url)
+
+        self.assertEqual(data, {'deleted': 5})
+        self.assertEqual(self.user.entries.count(), 0)
+        self.assertEqual(self.deleted_signals, [])
+
+    def test_authorization_limits(self):
+        resource = PublicEntriesUserResource()
+        resource.get_nested_resource('entries')._meta.bulk_delete = True
+        Entry.objects.filter(title='Entry 0').update(title='Public entry')
+
+        request = RequestFactory().delete('/?format=json')
+        response = resource.dispatch_nested(request, resource_name='user',
+                                            pk=str(self.user.pk),
+                                            nested_name='entries')
+
+        self.assertEqual(simplejson.loads(response.content), {'deleted': 1})
+        self.assertFalse(Entry.objects.filter(title='Public entry').exists())
+        self.assertEqual(self.user.entries.count(), 4)
+
+    def test_counts_rows_deleted(self):
+        resource = ConcurrentDeleteEntryResource()
+
+        for signals in (True, False):
+            resource._meta.bulk_delete_signals = signals
+            for i in range(4):
+                Entry.objects.create(user=self.user, title='Entry', body='')
+            total = Entry.objects.count()
+
+            request = RequestFactory().delete('/?format=json')
+            response = resource.dispatch_list(request)
+
+            # One entry of each chunk of two was removed by someone else.
+            self.assertEqual(simplejson.loads(response.content),
+                             {'deleted': total // 2})
+            self.assertEqual(Entry.objects.count(), 0)
+
+
+class EditableEntryResource(ExtendedModelResource):
+    user = fields.ForeignKey(UserResource, 'user')
+
+    class Meta:
+        queryset = Entry.objects.all()
+        resource_name = 'entry'
+        api_name = 'v1'
+        authorization = Authorization()
+
+
+class UnhashableText(unicode):
+    __hash__ = None
+
+
+class LoggingEntryResource(EditableEntryResource):
+    """
+    Logs the objects updated and created by ``patch_list``, in order.
+    """
+    class Meta(EditableEntryResource.Meta):
+        pass
+
+    def __init__(self, *args, **kwargs):
+        super(LoggingEntryResource, self).__init__(*args, **kwargs)
+        self.log = []
+
+    def update_in_place(self, request, original_bundle, new_data):
+        self.log.append(('update', original_bundle.obj.pk))
+        return super(LoggingEntryResource, self).update_in_place(request,
+                                                original_bundle, new_data)
+
+    def obj_create(self, bundle, request=None, **kwargs):
+        self.log.append(('create', bundle.data['title']))
+        return super(LoggingEntryResource, self).obj_create(bundle, request,
+                                                            **kwargs)
+
+
+class UnhashableTitleEntryResource(EditableEntryResource):
+    class Meta(EditableEntryResource.Meta):
+        bulk_update = True
+
+    def hydrate_title(self, bundle):
+        bundle.data['title'] = UnhashableText(bundle.data['title'])
+        return bundle
+
+
+class PatchListTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.other_user = User.objects.get(pk=1)
+        self.entries = [Entry.objects.create(user=self.user,
+                                             title='Entry %d' % i,
+                                             body='Body %d' % i)
+                        for i in range(3)]
+        self.other_entry = Entry.objects.create(user=self.other_user,
+                                                title='Other', body='Other')
+        self.url = '/api/v1/user/%s/entries/' % self.user.pk
+
+        self.nested_options = \
+            v1_api._registry['user'].get_nested_resource('entries')._meta
+
+    def tearDown(self):
+        self.nested_options.bulk_update = False
+
+    def uri(self, entry):
+        return '/api/v1/entry/%s/' % entry.pk
+
+    def patch(self, view, data, status_code=202, **kwargs):
+        request = RequestFactory().post('/?format=json',
+                                        data=simplejson.dumps(data),
+                                        content_type='application/json')
+        request.method = 'PATCH'
+
+        with CaptureQueries() as captured:
+            response = view(request, **kwargs)
+        self.assertEqual(response.status_code, status_code)
+        return captured.queries
+
+    def patch_nested(self, data, status_code=202):
+        return self.patch(v1_api._registry['user'].wrap_view(
+                                                    'dispatch_nested'), data,
+                          status_code, resource_name='user',
+                          pk=str(self.user.pk), nested_name='entries')
+
+    def test_nested(self):
+        queries = self.patch_nested({
+            'objects': [
+                {'resource_uri': self.uri(self.entries[0]),
+                 'title': 'First'},
+                {'resource_uri': self.uri(self.entries[1]),
+                 'body': 'Second'},
+                {'title': 'New', 'body': 'New', 'slug': 'new',
+                 'user': '/api/v1/user/%s/' % self.other_user.pk},
+            ],
+            'deleted_objects': [self.uri(self.entries[2])],
+        })
+
+        entries = Entry.objects.in_bulk([entry.pk for entry in self.entries])
+        self.assertEqual(entries[self.entries[0].pk].title, 'First')
+        self.assertEqual(entries[self.entries[0].pk].body, 'Body 0')
+        self.assertEqual(entries[self.entries[1].pk].body, 'Second')
+        self.assertFalse(self.entries[2].pk in entries)
+        self.assertEqual(self.user.entries.get(title='New').body, 'New')
+
+        # The updated and deleted entries are fetched with a single query.
+        selects = [sql for sql in queries
+                   if sql.startswith('SELECT "api_entry"."id"')]
+        self.assertEqual(len(selects), 1)
+
+    def test_nested_other_parent(self):
+        self.patch_nested({
+            'objects': [{'resource_uri': self.uri(self.other_entry),
+                         'title': 'Moved'}],
+        }, status_code=404)
+
+        self.assertEqual(Entry.objects.get(pk=self.other_entry.pk).title,
+                         'Other')
+
+    def test_bulk_update(self):
+        self.nested_options.bulk_update = True
+        queries = self.patch_nested({
+            'objects': [
+                {'resource_uri': self.uri(entry), 'body': 'Same'}
+                for entry in self.entries[:2]
+            ] + [
+                {'resource_uri': self.uri(self.entries[2]),
+                 'title': 'Changed'},
+            ],
+        })
+
+        self.assertEqual(
+            list(Entry.objects.filter(pk__in=[entry.pk for entry in self.entries]
+                        ).order_by('pk').values_list('title', 'body')),
+            [(u'Entry 0', u'Same'), (u'Entry 1', u'Same'),
+             (u'Changed', u'Body 2')])
+
+        updates = [sql for sql in queries if sql.startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+
+    def test_top_level(self):
+        queries = self.patch(EditableEntryResource().patch_list, {
+            'objects': [{'resource_uri': self.uri(entry), 'body': 'Patched'}
+                        for entry in self.entries + [self.other_entry]],
+        }, resource_name='entry')
+
+        self.assertEqual(Entry.objects.filter(body='Patched').count(), 4)
+        selects = [sql for sql in queries
+                   if sql.startswith('SELECT "api_entry"."id"')]
+        self.assertEqual(len(selects), 1)
+
+    def test_order_and_update_in_place(self):
+        resource = LoggingEntryResource()
+        self.patch(resource.patch_list, {
+            'objects': [
+                {'resource_uri': self.uri(self.entries[1]), 'body': 'First'},
+                {'title': 'New', 'body': 'New', 'slug': 'new',
+                 'user': '/api/v1/user/%s/' % self.user.pk},
+                {'resource_uri': self.uri(self.entries[0]), 'body': 'Last'},
+            ],
+            'deleted_objects': [self.uri(self.entries[2])],
+        }, resource_name='entry')
+
+        self.assertEqual(resource.log, [('update', self.entries[1].pk),
+                                        ('create', 'New'),
+                                        ('update', self.entries[0].pk)])
+        self.assertEqual(Entry.objects.get(pk=self.entries[0].pk).body,
+                         'Last')
+        self.assertFalse(Entry.objects.filter(pk=self.entries[2].pk).exists())
+
+    def test_bulk_update_unhashable(self):
+        self.patch(UnhashableTitleEntryResource().patch_list, {
+            'objects': [{'resource_uri': self.uri(entry), 'title': 'Same'}
+                        for entry in self.entries],
+        }, resource_name='entry')
+
+        self.assertEqual(Entry.objects.filter(title='Same').count(), 3)
+
+
+class InstrumentationTest(ResourceClientMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.entry = Entry.objects.get(pk=1)
+        self.collector = InstrumentationCollector(server_timing=True)
+        self.options = [UserResource._meta, EntryResource._meta,
+            v1_api._registry['user'].get_nested_resource('entries')._meta]
+        self.old_caches = [options.cache for options in self.options]
+        for options in self.options:
+            options.instrumentation = self.collector
+
+    def tearDown(self):
+        for options, cache in zip(self.options, self.old_caches):
+            options.instrumentation = NoInstrumentation()
+            options.cache = cache
+
+    def test_nested_list(self):
+        response, queries = self.get('/api/v1/user/%s/entries/' % self.user.pk)
+        stats = self.collector.get_stats()
+
+        dispatch_nested = stats[('user', 'entries', 'GET', 'dispatch_nested')]
+        self.assertEqual(dispatch_nested['count'], 1)
+        self.assertTrue(dispatch_nested['queries'] > 0)
+        self.assertTrue(dispatch_nested['time'] > 0)
+        self.assertEqual(stats[('entry', 'entries', 'GET', 'dispatch')]
+                         ['count'], 1)
+        self.assertEqual(stats[('entry', 'entries', 'GET', 'full_dehydrate')]
+                         ['count'], self.user.entries.count())
+        self.assertEqual(stats[('entry', 'entries', 'GET', 'serialize')]
+                         ['queries'], 0)
+
+        metrics = [metric.split(';')[0]
+                   for metric in response['Server-Timing'].split(', ')]
+        self.assertEqual(metrics, ['obj_get_list', 'full_dehydrate',
+                                   'serialize', 'dispatch',
+                                   'dispatch_nested'])
+
+    def test_cache_lookups(self):
+        for options in self.options[1:]:
+            options.cache = ObjectCache()
+        url = '/api/v1/entry/%s/' % self.entry.pk
+        self.get(url)
+        response, queries = self.get(url)
+
+        stats = self.collector.get_stats()[('entry', None, 'GET', 'dispatch')]
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual((stats['cache_hits'], stats['cache_misses']), (1, 1))
+        self.assertTrue('cache;desc="hits=1 misses=0"' in
+                        response['Server-Timing'])
+
+    def test_disabled(self):
+        for options in self.options:
+            options.instrumentation = NoInstrumentation()
+        response, queries = self.get('/api/v1/user/%s/entries/' % self.user.pk)
+
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(self.collector.get_stats(), {})
+
+
+class BenchmarksTest(TestCase):
+    def test_endpoints(self):
+        results = dict(endpoints(2, users=2, entries=3, set_size=2))
+
+        self.assertEqual(sorted(results), [
+            'detail', 'detail_by_name', 'list', 'multiple_get',
+            'nested_detail', 'nested_list', 'nested_to_one',
+            'uri_resolving'])
+        for measures in results.values():
+            self.assertEqual(measures['iterations'], 2)
+            self.assertTrue(measures['p50'] <= measures['p99'])
+        self.assertEqual(results['detail']['queries'], 1)
+
+    def test_reserved_kwargs(self):
+        results = dict(reserved_kwargs(2))
+
+        self.assertEqual(sorted(results), ['kwargs_reserved',
+                                           'kwargs_try_del'])
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        ('user', None, 'GET', 'dispatch_list'): 2,
+        ('user', None, 'GET', 'get_schema'): 0,
+        ('user', None, 'GET', 'get_multiple'): 1,
+        ('user', None, 'GET', 'dispatch_detail'): 1,
+        ('user', 'entries', 'GET', 'dispatch_nested'): 2,
+        ('user', 'entries', 'POST', 'dispatch_nested'): 16,
+        ('user', 'entries', 'PATCH', 'dispatch_nested'): 27,
+        ('user', 'entries', 'DELETE', 'dispatch_nested'): 3,
+        ('user', 'entries', 'GET', 'nested_get_multiple'): 1,
+        ('entry', None, 'GET', 'dispatch_list'): 2,
+        ('entry', None, 'GET', 'get_schema'): 0,
+        ('entry', None, 'GET', 'get_multiple'): 1,
+        ('entry', None, 'GET', 'dispatch_detail'): 1,
+        ('entry', 'entryinfo', 'GET', 'dispatch_nested'): 1,
+        ('userbyname', None, 'GET', 'dispatch_list'): 2,
+        ('userbyname', None, 'GET', 'get_schema'): 0,
+        ('userbyname', None, 'GET', 'get_multiple'): 1,
+        ('userbyname', None, 'GET', 'dispatch_detail'): 1,
+    }
+
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.entries = [Entry.objects.create(user=self.user,
+                                             title='Entry %d' % i,
+                                             body='Body %d' % i)
+                        for i in range(5)]
+        self.entry = self.entries[0]
+        self.entry.entryinfo = EntryInfo.objects.create(somefield='Info')
+        self.entry.save()
+        self.ids = ';'.join(str(entry.pk) for entry in self.entries)
+
+    def get(self, path):
+        return self.assertQueryBudget(path, data={'format': 'json'},
+                                      status_code=200)
+
+    def test_routes_have_budgets(self):
+        self.assertRoutesHaveQueryBudgets(v1_api._registry.values())
+
+    def test_user(self):
+        self.get('/api/v1/user/')
+        self.get('/api/v1/user/schema/')
+        self.get('/api/v1/user/set/1;2/')
+        self.get('/api/v1/user/%s/' % self.user.pk)
+
+    def test_entry(self):
+        self.get('/api/v1/entry/')
+        self.get('/api/v1/entry/schema/')
+        self.get('/api/v1/entry/set/%s/' % self.ids)
+        self.get('/api/v1/entry/%s/' % self.entry.pk)
+
+    def test_user_by_name(self):
+        self.get('/api/v1/userbyname/')
+        self.get('/api/v1/userbyname/schema/')
+        self.get('/api/v1/userbyname/set/admin;san-mate/')
+        self.get('/api/v1/userbyname/%s/' % self.user.username)
+
+    def test_nested(self):
+        url = '/api/v1/user/%s/entries/?format=json' % self.user.pk
+        self.get(url)
+        self.get('/api/v1/entry/%s/entryinfo/' % self.entry.pk)
+        self.get('/api/v1/user/%s/entries/set/%s/' % (self.user.pk, self.ids))
+
+        self.assertQueryBudget(url, 'POST', {'objects': [
+            {'title': 'New %d' % i, 'body': 'New', 'slug': 'new'}
+            for i in range(5)]}, status_code=201)
+        self.assertQueryBudget(url, 'PATCH', {'objects': [
+            {'resource_uri': '/api/v1/entry/%s/' % entry.pk, 'body': 'Patched'}
+            for entry in self.entries]}, status_code=202)
+        self.assertQueryBudget(url, 'DELETE', status_code=204)
+
+    def test_over_budget(self):
+        self.query_budgets = dict(self.query_budgets)
+        self.query_budgets[('user', None, 'GET', 'dispatch_detail')] = 0
+        self.assertRaises(AssertionError, self.get,
+                          '/api/v1/user/%s/' % self.user.pk)
+
+    def test_no_budget(self):
+        self.query_budgets = {}
+        self.assertRaises(AssertionError, self.get, '/api/v1/user/')
+
+
+class ResourceRoutesTest(TestCase):
+    def test_detail_actions(self):
+        self.assertEqual(get_resource_routes(CompiledEntryResource()), [
+            ('entry', None, 'dispatch_list'),
+            ('entry', None, 'get_schema'),
+            ('entry', None, 'get_multiple'),
+            ('entry', None, 'dispatch_detail'),
+            ('entry', 'entryinfo', 'dispatch_nested'),
+            ('entry', 'show_schema', 'dispatch_nested'),
+            ('entry', None, 'get_full_schema'),
+        ])
+
+
+class GetMultipleTest(ResourceClientMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=2)
+        self.entries = [Entry.objects.create(user=self.user,
+                                             title='Entry %d' % i,
+                                             body='Body %d' % i)
+                        for i in range(3)]
+        self.other_entry = Entry.objects.create(user=User.objects.get(pk=1),
+                                                title='Other', body='Other')
+        self.entry_options = [EntryResource._meta,
+            v1_api._registry['user'].get_nested_resource('entries')._meta]
+        self.old_cache = EntryResource._meta.cache
+
+    def tearDown(self):
+        for options in self.entry_options:
+            options.cache = self.old_cache
+
+    def ids(self, entries):
+        return ';'.join([str(entry.pk) for entry in entries] + ['0'])
+
+    def titles(self, data):
+        return [entry['title'] for entry in data['objects']]
+
+    def test_single_query(self):
+        entries = list(reversed(self.entries)) + [self.other_entry]
+        data, queries = self.get_data('/api/v1/entry/set/%s/' %
+                                      self.ids(entries))
+
+        self.assertEqual(self.titles(data),
+                         [entry.title for entry in entries])
+        self.assertEqual(data['not_found'], ['0'])
+        self.assertEqual(len(queries), 1)
+
+    def test_mismatched_type(self):
+        data, queries = self.get_data('/api/v1/entry/set/x;0%s/' %
+                                      self.entries[0].pk)
+
+        self.assertEqual(self.titles(data), ['Entry 0'])
+        self.assertEqual(data['not_found'], ['x'])
+
+    def test_cache(self):
+        for options in self.entry_options:
+            options.cache = ObjectCache()
+        url = '/api/v1/entry/set/%s/' % self.ids(self.entries[:2])
+        self.get_data('/api/v1/entry/%s/' % self.entries[0].pk)
+
+        data, queries = self.get_data(url)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(str(self.entries[1].pk) in queries[0])
+        self.assertFalse(str(self.entries[0].pk) in queries[0].split('IN')[1])
+
+        data, queries = self.get_data(url)
+        self.assertEqual(self.titles(data), ['Entry 0', 'Entry 1'])
+        self.assertEqual(len(queries), 1)
+
+    def test_nested(self):
+        entries = [self.entries[1], self.other_entry, self.entries[0]]
+        data, queries = self.get_data('/api/v1/user/%s/entries/set/%s/' % (
+                                          self.user.pk, self.ids(entries)))
+
+        self.assertEqual(self.titles(data), ['Entry 1', 'Entry 0'])
+        self.assertEqual(data['not_found'], [str(self.other_entry.pk), '0'])
+        self.assertEqual(len(queries), 1)
+
+    def test_nested_authorization_limits(self):
+        Entry.objects.filter(pk=self.entries[0].pk).update(
+                                                    title='Public entry')
+        request = RequestFactory().get('/?format=json')
+        response = PublicEntriesUserResource().dispatch_nested_multiple(
+                        request, resource_name='user', pk=str(self.user.pk),
+                        nested_name='entries',
+                        nested_list=self.ids(self.entries))
+
+        data = simplejson.loads(response.content)
+        self.assertEqual(self.titles(data), ['Public entry'])
+        self.assertEqual(len(data['not_found']), 3)
+
+
+class PostAggregateUserResource(UserResource):
+    class Meta(UserResource.Meta):
+        aggregate_allowed_methods = ['get', 'post']
+
+    def dispatch_aggregate(self, request, **kwargs):
+        return self.dispatch('aggregate', request, **kwargs)
+
+
+class GetOnlyListUserResource(UserResource):
+    def __init__(self, *args, **kwargs):
+        super(GetOnlyListUserResource, self).__init__(*args, **kwargs)
+        self._meta = copy_options(self._meta)
+        self._meta.list_allowed_methods = ['get']
+
+
+class DispatchTest(TestCase):
+    def setUp(self):
+        self.resource = PostAggregateUserResource()
+
+    def test_not_allowed(self):
+        request = RequestFactory().delete('/api/v1/user/aggregate/')
+        response = self.resource.wrap_view('dispatch_aggregate')(request)
+
+        self.assertEqual(response.status_code, 405)
+
+    def test_not_implemented(self):
+        request = RequestFactory().post('/api/v1/user/aggregate/')
+        response = self.resource.wrap_view('dispatch_aggregate')(request)
+
+        self.assertEqual(response.status_code, 501)
+
+    def test_instance_handler(self):
+        self.resource._meta = copy_options(self.resource._meta)
+        self.resource._meta.authorization = Authorization()
+        self.resource.post_aggregate = lambda request, **kwargs: \
+            HttpResponse(status=202)
+
+        request = RequestFactory().post('/api/v1/user/aggregate/')
+        response = self.resource.wrap_view('dispatch_aggregate')(request)
+
+        self.assertEqual(response.status_code, 202)
+
+    def test_options_replaced(self):
+        request = RequestFactory().delete('/api/v1/user/aggregate/')
+        view = self.resource.wrap_view('dispatch_aggregate')
+        self.assertEqual(view(request).status_code, 405)
+
+        self.resource._meta = copy_options(self.resource._meta)
+        self.resource._meta.aggregate_allowed_methods = ['get']
+        request = RequestFactory().post('/api/v1/user/aggregate/')
+        self.assertEqual(view(request).status_code, 405)
+        self.assertEqual(PostAggregateUserResource._meta
+                         .aggregate_allowed_methods, ['get', 'post'])
+
+    def test_changed_after_first_request(self):
+        self.resource._meta = copy_options(self.resource._meta)
+        self.resource._meta.authorization = Authorization()
+        view = self.resource.wrap_view('dispatch_aggregate')
+        request = RequestFactory().post('/api/v1/user/aggregate/')
+        self.assertEqual(view(request).status_code, 501)
+
+        self.resource.post_aggregate = lambda request, **kwargs: \
+            HttpResponse(status=202)
+        self.assertEqual(view(request).status_code, 202)
+
+        self.resource._meta.aggregate_allowed_methods = ['get']
+        self.assertEqual(view(request).status_code, 405)
+
+    def test_options_changed_in_init(self):
+        resource = GetOnlyListUserResource()
+        request = RequestFactory().post('/api/v1/user/',
+                                        content_type='application/json')
+        response = resource.wrap_view('dispatch_list')(request)
+
+        self.assertEqual(response.status_code, 405)
+
+    def test_remove_api_resource_names(self):
+        kwargs = dict((key, 'value') for key in RESERVED_KWARGS)
+        kwargs['pk'] = '1'
+
+        self.assertEqual(self.resource.real_remove_api_resource_names(kwargs),
+                         {'pk': '1'})
+        self.assertEqual(len(kwargs), len(RESERVED_KWARGS) + 1)
@@ -0,0 +1,231 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.urlresolvers import get_resolver, get_script_prefix, \
+    get_urlconf, resolve
+
+from tastypie.cache import NoCache
+
+
+# Versions of the keys of each model, by model label, shared by every
+# ``ObjectCache`` of the process. See ``ObjectCache.get_version``.
+model_versions = {}
+model_versions_lock = threading.Lock()
+
+
+def get_model_label(model):
+    """
+    Return the ``app_label.ModelName`` of a model.
+    """
+    return '%s.%s' % (model._meta.app_label, model._meta.object_name)
+
+
+class ObjectCache(NoCache):
+    """
+    Caches the objects fetched by ``ExtendedModelResource`` in the memory of
+    the process. Use it as the ``cache`` option of the resource.
+
+    Keeps at most ``max_entries`` objects, for ``timeout`` seconds, and drops
+    the least recently used ones first.
+
+    Keys are versioned per model: ``ExtendedModelResource`` puts the current
+    version of its model in the keys it uses, and calls ``invalidate`` when
+    it writes to that model, which makes every cached instance of the model
+    unreachable. The versions are shared by every ``ObjectCache`` of the
+    process, so a write through one resource invalidates the objects cached
+    by the other resources of the same model.
+    """
+
+    def __init__(self, timeout=60, max_entries=1000):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Gets a key from the cache. Returns ``None`` if the key is not found or
+        has expired.
+        """
+        with self._lock:
+            try:
+                expires, value = self._entries.pop(key)
+            except KeyError:
+                return None
+
+            if expires < time.time():
+                return None
+
+            # Mark it as the most recently used.
+            self._entries[key] = (expires, value)
+            return value
+
+    def set(self, key, value, timeout=None):
+        """
+        Sets a key-value in the cache, dropping the least recently used keys
+        if there are more than ``max_entries``.
+
+        Optionally accepts a ``timeout`` in seconds. Defaults to the
+        ``timeout`` of the cache.
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + timeout, value)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_many(self, keys):
+        """
+        Gets several keys from the cache at once. Returns a dictionary with
+        the keys which were found and have not expired.
+        """
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def set_many(self, data, timeout=None):
+        """
+        Sets several key-values of the dictionary ``data`` in the cache at
+        once.
+        """
+        for key, value in data.items():
+            self.set(key, value, timeout)
+
+    def get_version(self, model):
+        """
+        Return the current version of the keys of ``model``.
+        """
+        return model_versions.get(get_model_label(model), 0)
+
+    def invalidate(self, model):
+        """
+        Make every cached instance of ``model`` unreachable.
+        """
+        label = get_model_label(model)
+        with model_versions_lock:
+            model_versions[label] = model_versions.get(label, 0) + 1
+
+
+class SimpleObjectCache(ObjectCache):
+    """
+    Same as ``ObjectCache`` but uses Django's current ``CACHE_BACKEND``, so
+    the cached objects and their versions are shared by every process.
+
+    The number of entries is bounded by the backend, ``max_entries`` is
+    ignored.
+    """
+
+    def get(self, key):
+        return cache.get(key)
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+
+        cache.set(key, value, timeout)
+
+    def get_many(self, keys):
+        return cache.get_many(keys)
+
+    def set_many(self, data, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+
+        cache.set_many(data, timeout)
+
+    def get_version_key(self, model):
+        return 'extendedmodelresource:version:%s' % get_model_label(model)
+
+    def get_version(self, model):
+        # Versions are random instead of counters, so a version evicted from
+        # the cache never starts over and makes stale objects reachable.
+        version_key = self.get_version_key(model)
+        version = cache.get(version_key)
+
+        if version is None:
+            cache.add(version_key, uuid.uuid4().hex)
+            version = cache.get(version_key)
+
+        return version
+
+    def invalidate(self, model):
+        cache.set(self.get_version_key(model), uuid.uuid4().hex)
+
+
+class UriResolverCache(object):
+    """
+    Caches the result of resolving uris in the memory of the process, keeping
+    the ``max_entries`` most recently used ones.
+
+    Entries are keyed by urlconf, script prefix and uri, and are all dropped
+    when Django's url resolvers are reloaded (ie. after ``clear_url_caches``).
+    ``hits`` and ``misses`` count how many lookups were found in the cache.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._resolvers = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, uri):
+        """
+        Same as Django's ``resolve``, but takes a uri including the script
+        prefix.
+
+        Raises ``Resolver404`` if the uri can't be resolved.
+        """
+        urlconf = get_urlconf()
+        resolver = get_resolver(urlconf)
+        prefix = get_script_prefix()
+        key = (urlconf, prefix, uri)
+
+        with self._lock:
+            if self._resolvers.get(urlconf, resolver) is not resolver:
+                # The urlconfs were reloaded.
+                self._entries.clear()
+                self._resolvers.clear()
+            self._resolvers[urlconf] = resolver
+
+            match = self._entries.pop(key, None)
+            if match is not None:
+                self.hits += 1
+                self._entries[key] = match
+                return match
+
+            self.misses += 1
+
+        chomped_uri = uri
+        if prefix and chomped_uri.startswith(prefix):
+            chomped_uri = chomped_uri[len(prefix) - 1:]
+
+        match = resolve(chomped_uri, urlconf)
+
+        with self._lock:
+            self._entries[key] = match
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return match
+
+    def clear(self):
+        """
+        Drop every entry and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._resolvers.clear()
+            self.hits = 0
+            self.misses = 0
@@ -1,18 +1,169 @@
+import re
+import threading
+from calendar import timegm
+from hashlib import md5
+from itertools import groupby
+
 from django.http import HttpResponse
-from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
-from django.core.urlresolvers import get_script_prefix, resolve, Resolver404
+try:
+    from django.http import StreamingHttpResponse
+except ImportError:
+    # Before Django 1.5, an ``HttpResponse`` built from an iterator is
+    # streamed.
+    StreamingHttpResponse = HttpResponse
+from django.core.exceptions import ObjectDoesNotExist, \
+    MultipleObjectsReturned, ValidationError
+from django.conf import settings
+from django.core.urlresolvers import Resolver404, RegexURLPattern
 from django.conf.urls.defaults import patterns, url, include
+from django.db import router, transaction
+from django.db.models import Avg, Count, FieldDoesNotExist, ForeignKey, \
+    Max, Min, Q, Sum
+from django.db.models.deletion import Collector
+from django.db.models.fields.related import ForeignRelatedObjectsDescriptor, \
+    ManyRelatedObjectsDescriptor, ReverseManyRelatedObjectsDescriptor, \
+    ReverseSingleRelatedObjectDescriptor, SingleRelatedObjectDescriptor
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE, \
+    LOOKUP_SEP
+from django.db.models.sql.subqueries import DeleteQuery
+from django.utils.http import http_date, parse_etags, \
+    parse_http_date_safe, urlencode
+from django.views.decorators.csrf import csrf_exempt
 
 from tastypie import fields, http
-from tastypie.exceptions import NotFound, ImmediateHttpResponse
+from tastypie.exceptions import NotFound, BadRequest, ImmediateHttpResponse
 from tastypie.resources import ResourceOptions, ModelDeclarativeMetaclass, \
-    ModelResource, convert_post_to_put
-from tastypie.utils import trailing_slash
+    ModelResource, convert_post_to_patch, convert_post_to_put
+from tastypie.utils import dict_strip_unicode_keys, trailing_slash
+from tastypie.utils.mime import build_content_type
+
+from .cache import UriResolverCache
+from .instrumentation import NoInstrumentation, \
+    add_instrumentation_headers, instrumented, record_cache_lookup
+
+
+# Maximum number of values in the ``__in`` lookups of a single query. SQLite
+# does not allow more than 999 parameters per query.
+IN_LOOKUP_BATCH_SIZE = 500
+
+# Keys of the url kwargs, and of the kwargs added when dispatching to nested
+# resources, which are not lookups of the objects. See
+# ``real_remove_api_resource_names``.
+RESERVED_KWARGS = frozenset(['api_name', 'resource_name', 'related_manager',
+                             'child_object', 'parent_resource', 'nested_name',
+                             'parent_object', 'parent_queryset',
+                             'nested_list'])
+
+# Aggregates available in ``get_aggregate``, by querystring parameter.
+AGGREGATE_FUNCTIONS = {
+    'avg': Avg,
+    'max': Max,
+    'min': Min,
+    'sum': Sum,
+}
+
+
+class AuthorizationHooks(object):
+    """
+    Looks up the optional methods an ``Authorization`` class can implement
+    for ``ExtendedModelResource`` (eg. ``is_authorized_parent`` or
+    ``apply_limits_nested_<nested_name>``).
+
+    Whether the class of an ``Authorization`` implements each method is
+    looked up once, so requests only do a dictionary lookup to skip the
+    methods it does not implement. Methods set on the instance, or provided
+    by ``__getattr__``, are always looked up on the instance.
+    """
+
+    def __init__(self):
+        self._hooks = {}
+
+    def get(self, authorization, hook_name, nested_name=None):
+        """
+        Return the method ``hook_name`` (suffixed with ``_<nested_name>`` if
+        given) of ``authorization``, bound to it, or ``None`` if it does not
+        implement it.
+        """
+        authorization_class = authorization.__class__
+        key = (authorization_class, hook_name, nested_name)
+
+        try:
+            method_name, on_class, dynamic = self._hooks[key]
+        except KeyError:
+            method_name = hook_name
+            if nested_name is not None:
+                method_name = '%s_%s' % (hook_name, nested_name)
+
+            on_class = hasattr(authorization_class, method_name)
+            dynamic = hasattr(authorization_class, '__getattr__')
+            self._hooks[key] = (method_name, on_class, dynamic)
+
+        if (on_class or dynamic or
+                method_name in getattr(authorization, '__dict__', ())):
+            return getattr(authorization, method_name, None)
+
+        return None
+
+
+authorization_hooks = AuthorizationHooks()
+
+
+class ExtendedResourceOptions(ResourceOptions):
+    """
+    Same as ``ResourceOptions`` but with the defaults of the options only
+    supported by ``ExtendedModelResource``.
+    """
+    # Route all the urls under the detail view (nested resources and detail
+    # actions) through a single url pattern. See ``nested_urls``.
+    compiled_detail_urls = False
+    # Insert the objects created on a nested resource with ``bulk_create``.
+    # See ``obj_create_nested_list``.
+    nested_bulk_create = False
+    # Stream the JSON responses of ``get_list``, dehydrating
+    # ``streaming_chunk_size`` objects at a time. See ``get_list``.
+    streaming_list = False
+    streaming_chunk_size = 100
+    # Lookups passed to ``select_related`` and ``prefetch_related`` when
+    # fetching the objects to dehydrate. ``None`` means they are planned from
+    # the declared related fields. See ``get_related_lookups``.
+    select_related = None
+    prefetch_related = None
+    # Methods allowed on the aggregates of nested resources. See
+    # ``get_aggregate``.
+    aggregate_allowed_methods = ['get']
+    # Methods allowed on the ``set/`` urls of nested resources. See
+    # ``get_multiple``.
+    multiple_allowed_methods = ['get']
+    # Querystring parameter of GET requests listing the fields to return, or
+    # ``None`` to always return every field. See ``get_sparse_fields``.
+    sparse_fields_param = 'fields'
+    # Lookups of the model fields telling when an object was last modified,
+    # and its version (an integer incremented on every change). Either one
+    # enables conditional GET requests. See ``get_validators``.
+    last_modified_field = None
+    version_field = None
+    # Cache the rendered responses of details and nested lists in the
+    # ``cache`` of the resource. See ``cached_response``.
+    cache_responses = False
+    # Delete lists in chunks of ``bulk_delete_chunk_size`` objects, in a
+    # single transaction, and report how many objects were deleted. Without
+    # ``bulk_delete_signals``, rows are deleted without sending signals nor
+    # deleting related objects. See ``obj_delete_list``.
+    bulk_delete = False
+    bulk_delete_chunk_size = IN_LOOKUP_BATCH_SIZE
+    bulk_delete_signals = True
+    # Write the objects updated by a PATCH on a list with one ``UPDATE``
+    # query per set of changed values, instead of saving them one by one.
+    # See ``obj_update_list``.
+    bulk_update = False
+    # Records the time, SQL queries and cache lookups of the stages of each
+    # request. See ``extendedmodelresource.instrumentation``.
+    instrumentation = NoInstrumentation()
 
 
 class ExtendedDeclarativeMetaclass(ModelDeclarativeMetaclass):
     """
-    Same as ``DeclarativeMetaclass`` but uses ``AnyIdAttributeResourceOptions``
+    Same as ``DeclarativeMetaclass`` but uses ``ExtendedResourceOptions``
     instead of ``ResourceOptions`` and adds support for multiple nested fields
     defined in a "Nested" class (the same way as "Meta") inside the resources.
     """
@@ -22,7 +173,7 @@ class ExtendedDeclarativeMetaclass(ModelDeclarativeMetaclass):
                             name, bases, attrs)
 
         opts = getattr(new_class, 'Meta', None)
-        new_class._meta = ResourceOptions(opts)
+        new_class._meta = ExtendedResourceOptions(opts)
 
         # Will map nested fields names to the actual fields
         nested_fields = {}
@@ -40,13 +191,137 @@ class ExtendedDeclarativeMetaclass(ModelDeclarativeMetaclass):
 
         new_class._nested = nested_fields
 
+        # Plan the related objects to fetch along with the objects.
+        model = new_class._meta.object_class
+        if model is not None:
+            select_related, prefetch_related = get_related_lookups(model,
+                                                    new_class.base_fields)
+            if new_class._meta.select_related is None:
+                new_class._meta.select_related = select_related
+            if new_class._meta.prefetch_related is None:
+                new_class._meta.prefetch_related = prefetch_related
+
+        # Look up the authorization hooks of the resource beforehand.
+        authorization = new_class._meta.authorization
+        authorization_hooks.get(authorization, 'is_authorized_parent')
+        for nested_name in nested_fields.keys():
+            authorization_hooks.get(authorization, 'is_authorized_nested',
+                                    nested_name)
+            authorization_hooks.get(authorization, 'apply_limits_nested',
+                                    nested_name)
+
         return new_class
 
 
+def get_related_lookups(model, api_fields):
+    """
+    Return the lookups for ``select_related`` and ``prefetch_related`` that
+    let the related fields in ``api_fields`` be dehydrated without a query
+    per object.
+
+    Only the fields whose attribute is the name of a relation of ``model``
+    are taken into account. Reverse relations are only found if the related
+    model is already defined.
+    """
+    select_related = []
+    prefetch_related = []
+
+    for field_name, api_field in sorted(api_fields.items()):
+        attribute = api_field.attribute
+        if (not getattr(api_field, 'is_related', False) or
+                not isinstance(attribute, basestring)):
+            continue
+
+        descriptor = getattr(model, attribute, None)
+        if getattr(api_field, 'is_m2m', False):
+            if isinstance(descriptor, (ForeignRelatedObjectsDescriptor,
+                                       ManyRelatedObjectsDescriptor,
+                                       ReverseManyRelatedObjectsDescriptor)):
+                prefetch_related.append(attribute)
+        elif isinstance(descriptor, (ReverseSingleRelatedObjectDescriptor,
+                                     SingleRelatedObjectDescriptor)):
+            select_related.append(attribute)
+
+    return select_related, prefetch_related
+
+
+def copy_options(options):
+    """
+    Return a shallow copy of a ``ResourceOptions`` instance.
+
+    ``copy.copy`` can't be used since it calls ``ResourceOptions.__new__``
+    again, which would reset the allowed methods overridden in ``Meta``.
+    """
+    new_options = object.__new__(options.__class__)
+    new_options.__dict__.update(options.__dict__)
+    return new_options
+
+
+def get_detail_action_segment(pattern):
+    """
+    Return the url segment matched by a detail action, if its regex only
+    matches that literal segment (eg. ``^show_schema/$``). Otherwise return
+    ``None``.
+    """
+    if not isinstance(pattern, RegexURLPattern):
+        return None
+
+    match = re.match(r'^\^([\w-]+)%s\$$' % re.escape(trailing_slash()),
+                     pattern.regex.pattern)
+    if match is None:
+        return None
+
+    return match.group(1)
+
+
+def detail_action_view(pattern):
+    """
+    Wrap the view of a detail action so it can be called from
+    ``dispatch_detail_segment``.
+    """
+    def view(request, **kwargs):
+        del kwargs['nested_name']
+        kwargs.update(pattern.default_args)
+        return pattern.callback(request, **kwargs)
+
+    return view
+
+
 class ExtendedModelResource(ModelResource):
 
     __metaclass__ = ExtendedDeclarativeMetaclass
 
+    uri_resolver_cache = UriResolverCache(
+        max_entries=getattr(settings, 'EXTENDEDMODELRESOURCE_URI_CACHE_SIZE',
+                            1000))
+
+    def __init__(self, api_name=None):
+        super(ExtendedModelResource, self).__init__(api_name=api_name)
+
+        # Instances of the resources used as nested, by (nested_name,
+        # api_name). See ``get_nested_resource``.
+        self._nested_resources = {}
+        self._nested_resources_lock = threading.Lock()
+
+        # Views of the segments under the detail url, for
+        # ``compiled_detail_urls``. See ``dispatch_detail_segment``.
+        self._detail_segment_views = None
+
+    def wrap_view(self, view):
+        """
+        Same as original, but lets the ``instrumentation`` which recorded the
+        request add its headers (eg. ``Server-Timing``) to the response.
+        """
+        wrapper = super(ExtendedModelResource, self).wrap_view(view)
+
+        @csrf_exempt
+        def instrumented_wrapper(request, *args, **kwargs):
+            response = wrapper(request, *args, **kwargs)
+            add_instrumentation_headers(request, response)
+            return response
+
+        return instrumented_wrapper
+
     def remove_api_resource_names(self, url_dict):
         """
         Override this function, we are going to use some data for Nesteds.
@@ -65,13 +340,8 @@ class ExtendedModelResource(ModelResource):
         """
         kwargs_subset = url_dict.copy()
 
-        for key in ['api_name', 'resource_name', 'related_manager',
-                    'child_object', 'parent_resource', 'nested_name',
-                    'parent_object']:
-            try:
-                del(kwargs_subset[key])
-            except KeyError:
-                pass
+        for key in RESERVED_KWARGS.intersection(url_dict):
+            del kwargs_subset[key]
 
         return kwargs_subset
 
@@ -121,7 +391,32 @@ class ExtendedModelResource(ModelResource):
         Return the list of all urls nested under the detail view of a resource.
 
         Each resource listed as Nested will generate one url.
+
+        If ``compiled_detail_urls`` is set in the ``Meta`` class, a single url
+        is generated instead, which also handles the detail actions matching
+        a literal segment. It is dispatched by ``dispatch_detail_segment``
+        with a dictionary lookup on the last segment of the url, so Django
+        tries one url pattern instead of one per nested resource and detail
+        action. The url keeps the ``api_dispatch_nested`` name, which can be
+        reversed for detail actions too, passing the segment as
+        ``nested_name``.
         """
+        if self._meta.compiled_detail_urls:
+            segments = sorted(self.detail_segment_views().keys())
+            if not segments:
+                return []
+
+            return [url(r"^(?P<resource_name>%s)/(?P<%s>%s)/"
+                         r"(?P<nested_name>%s)%s$" %
+                        (self._meta.resource_name,
+                         self._meta.detail_uri_name,
+                         self.get_detail_uri_name_regex(),
+                         '|'.join([re.escape(segment)
+                                   for segment in segments]),
+                         trailing_slash()),
+                        csrf_exempt(self.dispatch_detail_segment),
+                        name='api_dispatch_nested')]
+
         def get_nested_url(nested_name):
             return url(r"^(?P<resource_name>%s)/(?P<%s>%s)/"
                         r"(?P<nested_name>%s)%s$" %
@@ -136,6 +431,70 @@ class ExtendedModelResource(ModelResource):
         return [get_nested_url(nested_name)
                 for nested_name in self._nested.keys()]
 
+    def nested_aggregate_urls(self):
+        """
+        Return the url of the aggregates of the nested resources, which are
+        dispatched by ``dispatch_nested_aggregate``.
+
+        It comes before the urls of ``nested_chain_urls``, so ``aggregate``
+        is a reserved word among the identifiers of the nested objects.
+        """
+        if not self._nested:
+            return []
+
+        return [url(r"^(?P<resource_name>%s)/(?P<%s>%s)/"
+                     r"(?P<nested_name>%s)/aggregate%s$" %
+                    (self._meta.resource_name,
+                     self._meta.detail_uri_name,
+                     self.get_detail_uri_name_regex(),
+                     '|'.join([re.escape(nested_name)
+                               for nested_name in sorted(self._nested.keys())]),
+                     trailing_slash()),
+                    self.wrap_view('dispatch_nested_aggregate'),
+                    name='api_nested_aggregate')]
+
+    def nested_multiple_urls(self):
+        """
+        Return the url of several objects of the nested resources (eg.
+        ``/user/<pk>/entries/set/1;2;3/``), which are dispatched by
+        ``dispatch_nested_multiple``.
+
+        It comes before the urls of ``nested_chain_urls``, so the nested
+        resources of an object whose identifier is ``set`` can't be reached.
+        """
+        if not self._nested:
+            return []
+
+        return [url(r"^(?P<resource_name>%s)/(?P<%s>%s)/"
+                     r"(?P<nested_name>%s)/set/(?P<nested_list>[^/]+)/$" %
+                    (self._meta.resource_name,
+                     self._meta.detail_uri_name,
+                     self.get_detail_uri_name_regex(),
+                     '|'.join([re.escape(nested_name)
+                               for nested_name in sorted(self._nested.keys())])),
+                    self.wrap_view('dispatch_nested_multiple'),
+                    name='api_nested_get_multiple')]
+
+    def nested_chain_urls(self):
+        """
+        Return the url of the paths going deeper than the nested resources,
+        which are dispatched by ``dispatch_nested_chain``.
+        """
+        if not self._nested:
+            return []
+
+        return [url(r"^(?P<resource_name>%s)/(?P<%s>%s)/"
+                     r"(?P<nested_name>%s)/(?P<nested_path>[^/]+(?:/[^/]+)*)"
+                     r"%s$" %
+                    (self._meta.resource_name,
+                     self._meta.detail_uri_name,
+                     self.get_detail_uri_name_regex(),
+                     '|'.join([re.escape(nested_name)
+                               for nested_name in sorted(self._nested.keys())]),
+                     trailing_slash()),
+                    self.wrap_view('dispatch_nested_chain'),
+                    name='api_dispatch_nested_chain')]
+
     def detail_actions(self):
         """
         Return urls of custom actions to be performed on the detail view of a
@@ -162,17 +521,58 @@ class ExtendedModelResource(ModelResource):
         """
         Return the url patterns corresponding to the detail actions available
         on this resource.
+
+        With ``compiled_detail_urls``, only the detail actions which could not
+        be handled by the url from ``nested_urls`` are included.
         """
-        if self.detail_actions():
+        detail_actions = self.detail_actions()
+        if self._meta.compiled_detail_urls:
+            detail_actions = [pattern for pattern in detail_actions
+                              if get_detail_action_segment(pattern) is None]
+
+        if detail_actions:
             detail_url = "^(?P<resource_name>%s)/(?P<%s>%s)/" % (
                             self._meta.resource_name,
                             self._meta.detail_uri_name,
                             self.get_detail_uri_name_regex()
             )
-            return patterns('', (detail_url, include(self.detail_actions())))
+            return patterns('', (detail_url, include(detail_actions)))
 
         return []
 
+    def detail_segment_views(self):
+        """
+        Return a dictionary mapping the last segment of the urls under the
+        detail view of the resource to the view handling them, for
+        ``compiled_detail_urls``.
+
+        Nested resources take precedence over detail actions, as they do when
+        each one has its own url. The views are already wrapped by
+        ``wrap_view``.
+        """
+        views = {}
+
+        for pattern in self.detail_actions():
+            segment = get_detail_action_segment(pattern)
+            if segment is not None and segment not in views:
+                views[segment] = detail_action_view(pattern)
+
+        for nested_name in self._nested.keys():
+            views[nested_name] = self.wrap_view('dispatch_nested')
+
+        return views
+
+    def dispatch_detail_segment(self, request, **kwargs):
+        """
+        Dispatch a request to an url under the detail view of the resource,
+        when using ``compiled_detail_urls``.
+        """
+        if self._detail_segment_views is None:
+            self._detail_segment_views = self.detail_segment_views()
+
+        view = self._detail_segment_views[kwargs['nested_name']]
+        return view(request, **kwargs)
+
     @property
     def urls(self):
         """
@@ -181,7 +581,9 @@ class ExtendedModelResource(ModelResource):
         Same as the original ``urls`` attribute but supports nested urls as
         well as detail actions urls.
         """
-        urls = self.prepend_urls() + self.base_urls() + self.nested_urls()
+        urls = self.prepend_urls() + self.base_urls() + self.nested_urls() + \
+               self.nested_aggregate_urls() + self.nested_multiple_urls() + \
+               self.nested_chain_urls()
         return patterns('', *urls) + self.detail_actions_urlpatterns()
 
     def is_authorized_over_parent(self, request, parent_object):
@@ -192,12 +594,31 @@ class ExtendedModelResource(ModelResource):
         Will call the ``is_authorized_parent`` function of the
         ``Authorization`` class.
         """
-        if hasattr(self._meta.authorization, 'is_authorized_parent'):
-            return self._meta.authorization.is_authorized_parent(request,
-                        parent_object)
+        authorization = self._meta.authorization
+        hook = authorization_hooks.get(authorization, 'is_authorized_parent')
+        if hook is not None:
+            return hook(request, parent_object)
 
         return True
 
+    def nested_authorization_hooks(self):
+        """
+        Return a dictionary mapping the name of each nested resource which has
+        custom authorization to the names of the methods implementing it in
+        the ``Authorization`` class.
+        """
+        authorization = self._meta.authorization
+        hooks = {}
+
+        for nested_name in self._nested.keys():
+            for hook_name in ('is_authorized_nested', 'apply_limits_nested'):
+                if authorization_hooks.get(authorization, hook_name,
+                                           nested_name) is not None:
+                    hooks.setdefault(nested_name, []).append(
+                                        '%s_%s' % (hook_name, nested_name))
+
+        return hooks
+
     def parent_obj_get(self, request=None, **kwargs):
         """
         Same as the original ``obj_get`` but called when a nested resource
@@ -206,52 +627,55 @@ class ExtendedModelResource(ModelResource):
         Will check authorization to see if the request is allowed to act on
         the parent resource.
         """
+        nested_name = kwargs.get('nested_name')
         kwargs = self.real_remove_api_resource_names(kwargs)
-        parent_object = self.get_object_list(request).get(**kwargs)
-
-        # If I am not authorized for the parent
-        if not self.is_authorized_over_parent(request, parent_object):
-            stringified_kwargs = ', '.join(["%s=%s" % (k, v)
-                                            for k, v in kwargs.items()])
-            raise self._meta.object_class.DoesNotExist("Couldn't find an "
-                    "instance of '%s' which matched '%s'." %
-                    (self._meta.object_class.__name__, stringified_kwargs))
-
-        return parent_object
+        return self.get_parent_object(request,
+                    self.get_object_list(request).filter(**kwargs), kwargs,
+                    nested_name)
 
+    @instrumented('parent_cached_obj_get')
     def parent_cached_obj_get(self, request=None, **kwargs):
         """
         Same as the original ``cached_obj_get`` but called when a nested
         resource wants to get its parent.
-        """
-        cache_key = self.generate_cache_key('detail', **kwargs)
-        bundle = self._meta.cache.get(cache_key)
 
-        if bundle is None:
-            bundle = self.parent_obj_get(request=request, **kwargs)
-            self._meta.cache.set(cache_key, bundle)
+        Authorization over the parent is checked again when it comes from the
+        cache.
+        """
+        if self.get_nested_select_related(kwargs.get('nested_name')):
+            # The nested object comes along with the parent, and could be
+            # stale if the parent came from the cache.
+            return self.parent_obj_get(request=request, **kwargs)
+
+        lookup_kwargs = self.real_remove_api_resource_names(kwargs)
+        cache_key = self.generate_object_cache_key('parent', request,
+                                                   **lookup_kwargs)
+        parent_object = self._meta.cache.get(cache_key)
+        record_cache_lookup(self, request, parent_object is not None)
+
+        if parent_object is None:
+            parent_object = self.parent_obj_get(request=request, **kwargs)
+            self._meta.cache.set(cache_key, parent_object)
+        elif not self.is_authorized_over_parent(request, parent_object):
+            raise self._meta.object_class.DoesNotExist(
+                    self.does_not_exist_message(lookup_kwargs))
 
-        return bundle
+        return parent_object
 
     def get_via_uri_resolver(self, uri):
         """
         Do the work of the original ``get_via_uri`` except calling ``obj_get``.
 
-        Use this as a helper function.
+        Use this as a helper function. Uris are resolved through
+        ``uri_resolver_cache``, shared by all the resources of the process.
         """
-        prefix = get_script_prefix()
-        chomped_uri = uri
-
-        if prefix and chomped_uri.startswith(prefix):
-            chomped_uri = chomped_uri[len(prefix) - 1:]
-
         try:
-            _view, _args, kwargs = resolve(chomped_uri)
+            match = self.uri_resolver_cache.resolve(uri)
         except Resolver404:
             raise NotFound("The URL provided '%s' was not a link to a valid "
                            "resource." % uri)
 
-        return kwargs
+        return match.kwargs.copy()
 
     def get_nested_via_uri(self, uri, parent_resource,
                            parent_object, nested_name, request=None):
@@ -259,7 +683,8 @@ class ExtendedModelResource(ModelResource):
         Obtain a nested resource from an uri, a parent resource and a parent
         object.
 
-        Calls ``obj_get`` which handles the authorization checks.
+        Calls ``obj_get`` which handles the authorization checks, so no more
+        than two rows of the nested resource are read.
         """
         # TODO: improve this to get parent resource & object from uri too?
         kwargs = self.get_via_uri_resolver(uri)
@@ -283,6 +708,176 @@ class ExtendedModelResource(ModelResource):
         return self.obj_get_no_auth_check(request=request,
                         **self.remove_api_resource_names(kwargs))
 
+    def get_multiple_via_uri(self, uris, request=None, related_lookups=False,
+                             **kwargs):
+        """
+        Obtain the objects of this resource pointed by a list of uris.
+
+        The uris are grouped by the url arguments other than the identifier
+        of the objects, and each group is fetched with a single ``__in``
+        query (per ``IN_LOOKUP_BATCH_SIZE`` uris). The authorization
+        checks are the same as in ``obj_get``: pass ``nested_name``,
+        ``parent_resource`` and ``parent_object`` in ``kwargs`` to get the
+        objects as nested. Other lookups in ``kwargs`` narrow the query.
+
+        If ``related_lookups`` is set, the objects are fetched ready to be
+        dehydrated (see ``apply_related_lookups``).
+
+        Returns a tuple with the list of objects found, in the order of
+        ``uris``, and the list of uris which do not point to an object of
+        this resource the request is authorized to get.
+        """
+        detail_uri_name = self._meta.detail_uri_name
+        groups = {}
+        identifiers_by_uri = []
+        not_found = []
+
+        for uri in uris:
+            try:
+                uri_kwargs = self.get_via_uri_resolver(uri)
+            except NotFound:
+                uri_kwargs = {}
+
+            if (uri_kwargs.get('resource_name', None) !=
+                    self._meta.resource_name or
+                    detail_uri_name not in uri_kwargs):
+                identifiers_by_uri.append((uri, None, None))
+                continue
+
+            uri_kwargs = self.real_remove_api_resource_names(uri_kwargs)
+
+            identifier = unicode(uri_kwargs.pop(detail_uri_name))
+            group_key = tuple(sorted(uri_kwargs.items()))
+            groups.setdefault(group_key, set()).add(identifier)
+            identifiers_by_uri.append((uri, group_key, identifier))
+
+        objects_by_group = {}
+        for group_key, identifiers in groups.items():
+            objects_by_group[group_key] = self.get_objects_by_identifier(
+                        identifiers, request=request,
+                        related_lookups=related_lookups,
+                        **dict(kwargs, **dict(group_key)))
+
+        objects = []
+        for uri, group_key, identifier in identifiers_by_uri:
+            obj = objects_by_group.get(group_key, {}).get(identifier, None)
+            if obj is None:
+                not_found.append(uri)
+            else:
+                objects.append(obj)
+
+        return objects, not_found
+
+    def get_objects_by_identifier(self, identifiers, request=None,
+                                  related_lookups=False, **kwargs):
+        """
+        Return a dictionary with the objects whose ``detail_uri_name`` is in
+        ``identifiers``, by identifier (as given).
+
+        The identifiers are converted by the model field of
+        ``detail_uri_name`` (eg. ``01`` matches the object whose pk is 1),
+        and the ones it rejects are not found. The objects are fetched with
+        a single ``__in`` query per ``IN_LOOKUP_BATCH_SIZE`` identifiers,
+        with the same authorization checks as ``obj_get`` and narrowed by
+        the lookups in ``kwargs``. If ``related_lookups`` is set, they are
+        fetched ready to be dehydrated (see ``apply_related_lookups``).
+
+        Raises ``NotFound`` if a lookup in ``kwargs`` has a mismatched type.
+        """
+        detail_uri_name = self._meta.detail_uri_name
+        field = self.get_detail_uri_field()
+
+        # The given identifiers, by the value of the field they stand for.
+        identifiers_by_value = {}
+        for identifier in identifiers:
+            value = identifier
+            if field is not None:
+                try:
+                    value = field.to_python(identifier)
+                except (TypeError, ValueError, ValidationError):
+                    continue
+            identifiers_by_value.setdefault(value, []).append(identifier)
+
+        values = identifiers_by_value.keys()
+        objects = {}
+
+        for start in xrange(0, len(values), IN_LOOKUP_BATCH_SIZE):
+            lookup_kwargs = self.real_remove_api_resource_names(kwargs)
+            lookup_kwargs['%s__in' % detail_uri_name] = \
+                    values[start:start + IN_LOOKUP_BATCH_SIZE]
+
+            try:
+                base_object_list = self.get_object_list(request).filter(
+                                                            **lookup_kwargs)
+                if related_lookups:
+                    base_object_list = self.apply_related_lookups(request,
+                                                            base_object_list)
+                object_list = self.apply_proper_authorization_limits(request,
+                                                    base_object_list, **kwargs)
+
+                for obj in object_list:
+                    for identifier in identifiers_by_value.get(
+                                    getattr(obj, detail_uri_name), ()):
+                        objects[identifier] = obj
+            except ValueError:
+                raise NotFound("Invalid resource lookup data provided "
+                               "(mismatched type).")
+
+        return objects
+
+    def get_detail_uri_field(self):
+        """
+        Return the model field of ``detail_uri_name``, or ``None`` if it is
+        not a field of the model.
+        """
+        opts = self._meta.object_class._meta
+        if self._meta.detail_uri_name == 'pk':
+            return opts.pk
+
+        try:
+            return opts.get_field(self._meta.detail_uri_name)
+        except FieldDoesNotExist:
+            return None
+
+    def cached_get_objects_by_identifier(self, identifiers, request=None,
+                                         **kwargs):
+        """
+        Same as ``get_objects_by_identifier``, fetching the objects ready to
+        be dehydrated, but uses the cache the same way ``cached_obj_get``
+        does, with a single ``get_many`` and ``set_many`` if the cache
+        supports them.
+        """
+        cache = self._meta.cache
+        detail_uri_name = self._meta.detail_uri_name
+        identifiers = set(unicode(identifier) for identifier in identifiers)
+        objects = {}
+        cache_keys = {}
+
+        if (hasattr(cache, 'get_many') and
+                (kwargs.get('parent_resource', None) is None or
+                 kwargs.get('parent_object', None) is not None)):
+            for identifier in identifiers:
+                cache_keys[identifier] = self.generate_obj_get_cache_key(
+                        request, **dict(kwargs, **{detail_uri_name: identifier}))
+
+            cached = cache.get_many(cache_keys.values())
+            for identifier, cache_key in cache_keys.items():
+                if cache_key in cached:
+                    objects[identifier] = cached[cache_key]
+                record_cache_lookup(self, request, cache_key in cached)
+
+        fetched = self.get_objects_by_identifier(
+                        identifiers.difference(objects), request=request,
+                        related_lookups=True, **kwargs)
+
+        if cache_keys and fetched:
+            cache.set_many(dict((cache_keys[identifier], obj)
+                                for identifier, obj in fetched.items()))
+
+        objects.update(fetched)
+        return objects
+
+    @instrumented('obj_get_list')
     def obj_get_list(self, request=None, **kwargs):
         """
         A ORM-specific implementation of ``obj_get_list``.
@@ -296,18 +891,63 @@ class ExtendedModelResource(ModelResource):
             # Grab a mutable copy.
             filters = request.GET.copy()
 
-        # Update with the provided kwargs.
-        filters.update(self.real_remove_api_resource_names(kwargs))
         applicable_filters = self.build_filters(filters=filters)
 
+        # Update with the provided kwargs. They are applied as they are,
+        # since when used as nested they contain the filters of the related
+        # manager (eg. ``user__id``), which ``build_filters`` would reject
+        # unless the resource allows filtering on them.
+        applicable_filters.update(self.real_remove_api_resource_names(kwargs))
+
         try:
-            base_object_list = self.apply_filters(request, applicable_filters)
+            base_object_list = self.apply_related_lookups(request,
+                                self.apply_filters(request, applicable_filters))
             return self.apply_proper_authorization_limits(request,
                                                 base_object_list, **kwargs)
         except ValueError:
             raise BadRequest("Invalid resource lookup data provided "
                              "(mismatched type).")
 
+    def get_select_related(self, request):
+        """
+        Return the lookups passed to ``select_related`` when fetching the
+        objects to dehydrate. Override it to change them per request.
+        """
+        return self._meta.select_related
+
+    def get_prefetch_related(self, request):
+        """
+        Return the lookups passed to ``prefetch_related`` when fetching the
+        objects to dehydrate. Override it to change them per request.
+        """
+        return self._meta.prefetch_related
+
+    def apply_related_lookups(self, request, object_list):
+        """
+        Make ``object_list`` fetch the related objects needed to dehydrate
+        its objects, and only the columns needed when a sparse fieldset is
+        requested (see ``apply_sparse_fields``).
+        """
+        select_related = self.get_select_related(request)
+        prefetch_related = self.get_prefetch_related(request)
+
+        # Only the relations of the returned fields are needed.
+        attributes = self.get_sparse_attributes(request)
+        if attributes is not None:
+            select_related = [lookup for lookup in select_related
+                              if lookup.split(LOOKUP_SEP)[0] in attributes]
+            prefetch_related = [lookup for lookup in prefetch_related
+                                if lookup.split(LOOKUP_SEP)[0] in attributes]
+
+        if select_related:
+            object_list = object_list.select_related(*select_related)
+
+        if prefetch_related:
+            object_list = object_list.prefetch_related(*prefetch_related)
+
+        return self.apply_sparse_fields(request, object_list)
+
+    @instrumented('obj_get')
     def obj_get(self, request=None, **kwargs):
         """
         Same as the original ``obj_get`` but knows when it is being called to
@@ -315,38 +955,44 @@ class ExtendedModelResource(ModelResource):
 
         Performs authorization checks in every case.
         """
-        try:
-            base_object_list = self.get_object_list(request).filter(
-                                **self.real_remove_api_resource_names(kwargs))
+        lookup_kwargs = self.real_remove_api_resource_names(kwargs)
 
-            object_list = self.apply_proper_authorization_limits(request,
-                                                base_object_list, **kwargs)
+        try:
+            object_list = self.apply_related_lookups(request,
+                            self.get_detail_object_list(request, **kwargs))
 
-            stringified_kwargs = ', '.join(["%s=%s" % (k, v)
-                                            for k, v in kwargs.items()])
-
-            if len(object_list) <= 0:
-                raise self._meta.object_class.DoesNotExist("Couldn't find an "
-                            "instance of '%s' which matched '%s'." %
-                            (self._meta.object_class.__name__,
-                             stringified_kwargs))
-            elif len(object_list) > 1:
-                raise MultipleObjectsReturned("More than '%s' matched '%s'." %
-                        (self._meta.object_class.__name__, stringified_kwargs))
-
-            return object_list[0]
+            return self.get_single_object(object_list, lookup_kwargs)
         except ValueError:
             raise NotFound("Invalid resource lookup data provided (mismatched "
                            "type).")
 
+    def get_detail_object_list(self, request, **kwargs):
+        """
+        Return the authorized objects matching the lookups in ``kwargs``, of
+        which ``obj_get`` expects a single one.
+        """
+        lookup_kwargs = self.real_remove_api_resource_names(kwargs)
+        return self.apply_proper_authorization_limits(request,
+                    self.get_object_list(request).filter(**lookup_kwargs),
+                    **kwargs)
+
     def cached_obj_get(self, request=None, **kwargs):
         """
         A version of ``obj_get`` that uses the cache as a means to get
         commonly-accessed data faster.
+
+        Authorization over an object coming from the cache is checked again
+        with ``is_authorized_over_cached_object``. If it fails, the object
+        is fetched again with ``obj_get``, applying the authorization limits.
         """
-        cache_key = self.generate_cache_key('detail',
-                                **self.real_remove_api_resource_names(kwargs))
+        cache_key = self.generate_obj_get_cache_key(request, **kwargs)
         bundle = self._meta.cache.get(cache_key)
+        record_cache_lookup(self, request, bundle is not None)
+
+        if (bundle is not None and
+                not self.is_authorized_over_cached_object(request, bundle,
+                                                          **kwargs)):
+            bundle = None
 
         if bundle is None:
             bundle = self.obj_get(request=request, **kwargs)
@@ -354,21 +1000,116 @@ class ExtendedModelResource(ModelResource):
 
         return bundle
 
+    def is_authorized_over_cached_object(self, request, obj, **kwargs):
+        """
+        Tell if ``request`` is still authorized to get ``obj``, which
+        ``cached_obj_get`` found in the cache.
+
+        Calls ``is_authorized`` of the ``Authorization`` class with the
+        object and, if used as nested, ``is_authorized_nested_<nested_name>``
+        of the ``Authorization`` class of the parent resource. Override it
+        to check what the authorization limits of the resource check, if
+        they can change while the objects are cached.
+        """
+        auth_result = self._meta.authorization.is_authorized(request, obj)
+        if auth_result is not True:
+            return False
+
+        parent_resource = kwargs.get('parent_resource', None)
+        if parent_resource is None:
+            return True
+
+        authorization = parent_resource._meta.authorization
+        hook = authorization_hooks.get(authorization, 'is_authorized_nested',
+                                       kwargs.get('nested_name', None))
+        if hook is None:
+            return True
+
+        return hook(request, kwargs.get('parent_object', None), obj) is True
+
+    def generate_obj_get_cache_key(self, request, **kwargs):
+        """
+        Return the key of the object ``cached_obj_get`` gets with ``kwargs``.
+        """
+        lookup_kwargs = self.real_remove_api_resource_names(kwargs)
+
+        # Objects only loading the columns of a sparse fieldset are cached
+        # apart.
+        attributes = self.get_sparse_attributes(request)
+        if attributes is not None:
+            lookup_kwargs['sparse'] = ','.join(sorted(attributes))
+
+        if kwargs.get('parent_resource', None) is not None:
+            # Used as nested, the authorization limits are not the same.
+            return self.generate_object_cache_key('nested', request,
+                        kwargs['parent_resource']._meta.resource_name,
+                        getattr(kwargs['parent_object'], 'pk', None),
+                        kwargs['nested_name'],
+                        **lookup_kwargs)
+
+        return self.generate_object_cache_key('detail', request,
+                                              **lookup_kwargs)
+
+    def get_authorization_scope(self, request):
+        """
+        Return a string identifying which objects ``request`` is authorized to
+        get, used in the keys of the cached objects so objects fetched for a
+        request are only reused for requests with the same authorization.
+
+        By default this is the user making the request. Override it if the
+        authorization of the resource depends on anything else.
+        """
+        user = getattr(request, 'user', None)
+
+        if user is None or not user.is_authenticated():
+            return 'anonymous'
+
+        return 'user=%s' % user.pk
+
+    def generate_object_cache_key(self, prefix, request, *args, **kwargs):
+        """
+        Same as ``generate_cache_key`` but also includes the authorization
+        scope of the request and, if the cache supports it, the version of the
+        model of the resource.
+        """
+        version = 0
+        if hasattr(self._meta.cache, 'get_version'):
+            version = self._meta.cache.get_version(self._meta.object_class)
+
+        return self.generate_cache_key(prefix, 'version=%s' % version,
+                                       self.get_authorization_scope(request),
+                                       *[unicode(arg) for arg in args],
+                                       **kwargs)
+
+    def invalidate_cached_objects(self):
+        """
+        Make the objects of the resource stored in the cache unreachable, if
+        the cache supports it.
+
+        Called after every write done through the resource.
+        """
+        if hasattr(self._meta.cache, 'invalidate'):
+            self._meta.cache.invalidate(self._meta.object_class)
+
     def obj_create(self, bundle, request=None, **kwargs):
         """
         A ORM-specific implementation of ``obj_create``.
         """
         kwargs = self.real_remove_api_resource_names(kwargs)
-        return super(ExtendedModelResource, self).obj_create(bundle, request,
-                                                             **kwargs)
+        bundle = super(ExtendedModelResource, self).obj_create(bundle, request,
+                                                               **kwargs)
+        self.invalidate_cached_objects()
+        return bundle
 
     def obj_update(self, bundle, request=None, skip_errors=False, **kwargs):
         """
         A ORM-specific implementation of ``obj_update``.
         """
         kwargs = self.real_remove_api_resource_names(kwargs)
-        return super(ExtendedModelResource, self).obj_update(bundle, request,
+        bundle = super(ExtendedModelResource, self).obj_update(bundle, request,
                                             skip_errors=skip_errors, **kwargs)
+        self.invalidate_cached_objects()
+        return bundle
 
     def obj_delete_list(self, request=None, **kwargs):
         """
@@ -381,6 +1122,11 @@ class ExtendedModelResource(ModelResource):
         authed_object_list = self.apply_proper_authorization_limits(request,
                                                     base_object_list, **kwargs)
 
+        if self._meta.bulk_delete:
+            deleted = self.bulk_delete(authed_object_list)
+            self.invalidate_cached_objects()
+            return deleted
+
         if hasattr(authed_object_list, 'delete'):
             # It's likely a ``QuerySet``. Call ``.delete()`` for efficiency.
             authed_object_list.delete()
@@ -388,6 +1134,86 @@ class ExtendedModelResource(ModelResource):
             for authed_obj in authed_object_list:
                 authed_obj.delete()
 
+        self.invalidate_cached_objects()
+
+    @transaction.commit_on_success
+    def bulk_delete(self, object_list):
+        """
+        Delete the objects in the ``object_list`` queryset, in chunks of
+        ``bulk_delete_chunk_size``, in a single transaction. Return the
+        number of objects deleted.
+
+        Each chunk takes one query to select the primary keys of the objects,
+        which includes the authorization limits of ``object_list``, and then
+        ``delete_chunk`` deletes them.
+        """
+        model = self._meta.object_class
+        using = router.db_for_write(model)
+        chunk_size = self._meta.bulk_delete_chunk_size
+
+        # Walk the primary keys in order, so objects which are not deleted
+        # (eg. by a signal) are not selected again.
+        object_list = object_list.order_by('pk')
+        deleted = 0
+        last_pk = None
+
+        while True:
+            chunk = object_list
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            pks = list(chunk.values_list('pk', flat=True)[:chunk_size])
+
+            if not pks:
+                break
+
+            deleted += self.delete_chunk(pks, using)
+            last_pk = pks[-1]
+
+        return deleted
+
+    def delete_chunk(self, pks, using):
+        """
+        Delete the objects whose primary key is in ``pks`` and return the
+        number of rows deleted, which leaves out the objects removed since
+        their primary keys were selected.
+
+        With the ``bulk_delete_signals`` option, the objects are fetched
+        and deleted as Django usually does, and the ones fetched are
+        counted. Otherwise ``DELETE`` queries are run directly, which don't
+        send signals nor delete related objects, and count their rows.
+        """
+        model = self._meta.object_class
+
+        if self._meta.bulk_delete_signals:
+            objects = list(model._default_manager.using(using).filter(
+                                                                pk__in=pks))
+            collector = Collector(using=using)
+            collector.collect(objects)
+            collector.delete()
+            return len(objects)
+
+        deleted = 0
+        for offset in range(0, len(pks), GET_ITERATOR_CHUNK_SIZE):
+            query = DeleteQuery(model)
+            query.add_q(Q(pk__in=pks[offset:offset + GET_ITERATOR_CHUNK_SIZE]))
+            cursor = query.get_compiler(using).execute_sql(None)
+            if cursor is not None:
+                deleted += cursor.rowcount
+        return deleted
+
+    def delete_list(self, request, **kwargs):
+        """
+        Same as original, but with the ``bulk_delete`` option the response
+        reports the number of objects ``deleted`` (200 OK).
+        """
+        deleted = self.obj_delete_list(request=request,
+                                    **self.remove_api_resource_names(kwargs))
+
+        if not self._meta.bulk_delete:
+            return http.HttpNoContent()
+
+        return self.create_response(request, {'deleted': deleted})
+
     def obj_delete(self, request=None, **kwargs):
         """
         A ORM-specific implementation of ``obj_delete``.
@@ -405,6 +1231,7 @@ class ExtendedModelResource(ModelResource):
                 raise NotFound("A model instance matching the provided arguments could not be found.")
 
         obj.delete()
+        self.invalidate_cached_objects()
 
     def obj_get_no_auth_check(self, request=None, **kwargs):
         """
@@ -417,23 +1244,43 @@ class ExtendedModelResource(ModelResource):
         #       kwargs to know if we should check for auth?
         try:
             object_list = self.get_object_list(request).filter(**kwargs)
-            stringified_kwargs = ', '.join(["%s=%s" % (k, v)
-                                            for k, v in kwargs.items()])
-
-            if len(object_list) <= 0:
-                raise self._meta.object_class.DoesNotExist("Couldn't find an "
-                            "instance of '%s' which matched '%s'." %
-                            (self._meta.object_class.__name__,
-                             stringified_kwargs))
-            elif len(object_list) > 1:
-                raise MultipleObjectsReturned("More than '%s' matched '%s'." %
-                        (self._meta.object_class.__name__, stringified_kwargs))
-
-            return object_list[0]
+            return self.get_single_object(object_list, kwargs)
         except ValueError:
             raise NotFound("Invalid resource lookup data provided (mismatched "
                            "type).")
 
+    def get_single_object(self, object_list, lookup_kwargs):
+        """
+        Return the only object in ``object_list``, which is usually an
+        unevaluated ``QuerySet``.
+
+        At most two rows are read from the database: one to return and one
+        to know if the lookup was ambiguous. ``lookup_kwargs`` are only used
+        to build the error message when there is not exactly one match.
+        """
+        objects = list(object_list[:2])
+
+        if not objects:
+            raise self._meta.object_class.DoesNotExist(
+                    self.does_not_exist_message(lookup_kwargs))
+        elif len(objects) > 1:
+            stringified_kwargs = ', '.join(["%s=%s" % (k, v)
+                                            for k, v in lookup_kwargs.items()])
+            raise MultipleObjectsReturned("More than '%s' matched '%s'." %
+                    (self._meta.object_class.__name__, stringified_kwargs))
+
+        return objects[0]
+
+    def does_not_exist_message(self, lookup_kwargs):
+        """
+        Build the message of the ``DoesNotExist`` raised when no object
+        matches ``lookup_kwargs``.
+        """
+        stringified_kwargs = ', '.join(["%s=%s" % (k, v)
+                                        for k, v in lookup_kwargs.items()])
+        return ("Couldn't find an instance of '%s' which matched '%s'." %
+                (self._meta.object_class.__name__, stringified_kwargs))
+
     def apply_nested_authorization_limits(self, request, object_list,
                                                parent_resource, parent_object,
                                                nested_name):
@@ -441,10 +1288,11 @@ class ExtendedModelResource(ModelResource):
         Allows the ``Authorization`` class to further limit the object list.
         Also a hook to customize per ``Resource``.
         """
-        method_name = 'apply_limits_nested_%s' % nested_name
-        if hasattr(parent_resource._meta.authorization, method_name):
-            method = getattr(parent_resource._meta.authorization, method_name)
-            object_list = method(request, parent_object, object_list)
+        authorization = parent_resource._meta.authorization
+        hook = authorization_hooks.get(authorization, 'apply_limits_nested',
+                                       nested_name)
+        if hook is not None:
+            object_list = hook(request, parent_object, object_list)
 
         return object_list
 
@@ -464,41 +1312,198 @@ class ExtendedModelResource(ModelResource):
                     kwargs.get('parent_object', None),
                     kwargs.get('nested_name', None))
 
-    def dispatch_nested(self, request, **kwargs):
+    def get_nested_resource(self, nested_name):
         """
-        Dispatch a request to the nested resource.
+        Return the instance of the resource used as nested ``nested_name``.
+
+        Instances are created once per nested name and ``api_name`` and then
+        reused by every request, so the fields of the nested resource are not
+        rebuilt each time.
         """
-        # We don't check for is_authorized here since it will be
-        # parent_cached_obj_get which will check that we have permissions
-        # over the parent.
-        self.is_authenticated(request)
-        self.throttle_check(request)
+        key = (nested_name, self._meta.api_name)
+        nested_resource = self._nested_resources.get(key)
+
+        if nested_resource is None:
+            with self._nested_resources_lock:
+                nested_resource = self._nested_resources.get(key)
+                if nested_resource is None:
+                    nested_resource = self._nested[nested_name].to_class()
+
+                    # The nested resource needs to get the api_name from its
+                    # parent because it is possible that the resource being
+                    # used as nested is not registered in the API (ie. it can
+                    # only be used as nested). Its options are copied first,
+                    # since they are shared with every other instance of the
+                    # resource.
+                    nested_resource._meta = copy_options(
+                                                    nested_resource._meta)
+                    nested_resource._meta.api_name = self._meta.api_name
+                    self._nested_resources[key] = nested_resource
+
+        return nested_resource
+
+    def get_nested_descriptor(self, nested_name):
+        """
+        Return the descriptor of the model relation used by the nested
+        ``nested_name``, or ``None`` if its attribute is not a string.
+        """
+        attribute = self._nested[nested_name].attribute
+        if not isinstance(attribute, basestring):
+            return None
 
-        nested_name = kwargs.pop('nested_name')
-        nested_field = self._nested[nested_name]
+        return getattr(self._meta.object_class, attribute, None)
 
-        try:
-            obj = self.parent_cached_obj_get(request=request,
-                        **self.remove_api_resource_names(kwargs))
-        except ObjectDoesNotExist:
-            return http.HttpNotFound()
-        except MultipleObjectsReturned:
-            return http.HttpMultipleChoices("More than one parent resource is "
-                                            "found at this URI.")
+    def get_nested_select_related(self, nested_name):
+        """
+        Return the lookups passed to ``select_related`` when fetching the
+        parent of the nested ``nested_name``: its attribute if it is a to-one
+        relation, so that the nested object is fetched in the same query.
+        """
+        if nested_name is None:
+            return []
 
-        # The nested resource needs to get the api_name from its parent because
-        # it is possible that the resource being used as nested is not
-        # registered in the API (ie. it can only be used as nested)
-        nested_resource = nested_field.to_class()
-        nested_resource._meta.api_name = self._meta.api_name
+        descriptor = self.get_nested_descriptor(nested_name)
+        if isinstance(descriptor, (ReverseSingleRelatedObjectDescriptor,
+                                   SingleRelatedObjectDescriptor)):
+            return [self._nested[nested_name].attribute]
 
-        # TODO: comment further to make sense of this block
-        manager = None
-        try:
-            if isinstance(nested_field.attribute, basestring):
-                name = nested_field.attribute
-                manager = getattr(obj, name, None)
-            elif callable(nested_field.attribute):
+        return []
+
+    def get_nested_parent_lookup(self, nested_name):
+        """
+        Return the lookup from the objects of the nested ``nested_name`` to
+        their parent (eg. ``user`` for the entries of a user), or ``None`` if
+        it is not a to-many relation.
+        """
+        descriptor = self.get_nested_descriptor(nested_name)
+        if isinstance(descriptor, (ForeignRelatedObjectsDescriptor,
+                                   ManyRelatedObjectsDescriptor)):
+            return descriptor.related.field.name
+        elif isinstance(descriptor, ReverseManyRelatedObjectsDescriptor):
+            return descriptor.field.related_query_name()
+
+        return None
+
+    def has_parent_authorization_hooks(self, nested_name):
+        """
+        Tell if the ``Authorization`` class receives the parent object of the
+        nested ``nested_name``, in ``is_authorized_parent``,
+        ``is_authorized_nested_<nested_name>`` or
+        ``apply_limits_nested_<nested_name>``.
+        """
+        authorization = self._meta.authorization
+        if authorization_hooks.get(authorization,
+                                   'is_authorized_parent') is not None:
+            return True
+
+        for hook_name in ('is_authorized_nested', 'apply_limits_nested'):
+            if authorization_hooks.get(authorization, hook_name,
+                                       nested_name) is not None:
+                return True
+
+        return False
+
+    def overrides_parent_object_get(self):
+        """
+        Tell if the resource overrides one of the methods fetching the parent
+        object of its nested resources and checking the authorization over
+        it (``parent_cached_obj_get``, ``parent_obj_get`` and
+        ``is_authorized_over_parent``).
+        """
+        for method_name in ('parent_cached_obj_get', 'parent_obj_get',
+                            'is_authorized_over_parent'):
+            method = getattr(self, method_name)
+            if (getattr(method, 'im_func', None) is not
+                    getattr(ExtendedModelResource, method_name).im_func):
+                return True
+
+        return False
+
+    def nested_needs_parent_object(self, request, nested_name):
+        """
+        Tell if the parent object must be fetched to dispatch ``request`` to
+        the to-many nested ``nested_name``.
+
+        It is not needed to list the nested objects, unless the
+        ``Authorization`` class receives it (see
+        ``has_parent_authorization_hooks``) or the resource overrides the
+        methods fetching it (see ``overrides_parent_object_get``). Override
+        it to return ``True`` if you override other methods calling the
+        hooks.
+        """
+        if request.method != 'GET':
+            return True
+
+        return (self.has_parent_authorization_hooks(nested_name) or
+                self.overrides_parent_object_get())
+
+    def get_parent_object(self, request, object_list, lookup_kwargs,
+                          nested_name=None):
+        """
+        Return the only object in ``object_list`` as the parent of the nested
+        ``nested_name``, fetching the nested object along with it when it is a
+        to-one relation.
+
+        Raises ``DoesNotExist`` if the request is not authorized over the
+        parent.
+        """
+        select_related = self.get_nested_select_related(nested_name)
+        if select_related:
+            object_list = object_list.select_related(*select_related)
+
+        parent_object = self.get_single_object(object_list, lookup_kwargs)
+
+        # If I am not authorized for the parent
+        if not self.is_authorized_over_parent(request, parent_object):
+            raise self._meta.object_class.DoesNotExist(
+                    self.does_not_exist_message(lookup_kwargs))
+
+        return parent_object
+
+    def dispatch_nested_without_parent(self, request, nested_name,
+                                       parent_lookup, parent_queryset,
+                                       request_type='list', **kwargs):
+        """
+        Dispatch a request to the to-many nested ``nested_name`` without
+        fetching its parent, the only object in ``parent_queryset``.
+
+        The nested objects are filtered with a subquery on the parent, so they
+        are read in a single query. The nested resource checks that the
+        parent exists when there are no nested objects.
+        """
+        kwargs['nested_name'] = nested_name
+        kwargs['parent_resource'] = self
+        kwargs['parent_object'] = None
+        kwargs['parent_queryset'] = parent_queryset
+        kwargs['%s__in' % parent_lookup] = parent_queryset.values('pk')
+
+        return self.get_nested_resource(nested_name).dispatch(
+            request_type,
+            request,
+            **kwargs
+        )
+
+    def dispatch_nested_with_parent(self, request, nested_name, obj,
+                                    request_type='list', **kwargs):
+        """
+        Dispatch a request to the nested ``nested_name`` of the parent
+        ``obj``.
+
+        ``request_type`` is the type of the request when the nested resource
+        is a to-many relation. Otherwise only ``list`` is supported, and the
+        nested object is dispatched as a detail.
+        """
+        nested_field = self._nested[nested_name]
+        nested_resource = self.get_nested_resource(nested_name)
+
+        # Get the nested object (for to-one relations) or the related manager
+        # of the nested objects (for to-many relations) from the parent.
+        manager = None
+        try:
+            if isinstance(nested_field.attribute, basestring):
+                name = nested_field.attribute
+                manager = getattr(obj, name, None)
+            elif callable(nested_field.attribute):
                 manager = nested_field.attribute(obj)
             else:
                 raise fields.ApiFieldError(
@@ -516,10 +1521,13 @@ class ExtendedModelResource(ModelResource):
         kwargs['parent_object'] = obj
 
         if manager is None or not hasattr(manager, 'all'):
+            if request_type != 'list':
+                return http.HttpNotFound()
+
             dispatch_type = 'detail'
             kwargs['child_object'] = manager
         else:
-            dispatch_type = 'list'
+            dispatch_type = request_type
             kwargs['related_manager'] = manager
             # 'pk' will refer to the parent, so we remove it.
             if 'pk' in kwargs:
@@ -534,6 +1542,182 @@ class ExtendedModelResource(ModelResource):
             **kwargs
         )
 
+    @instrumented('dispatch_nested')
+    def dispatch_nested(self, request, request_type='list', **kwargs):
+        """
+        Dispatch a request to the nested resource.
+        """
+        # We don't check for is_authorized here since it will be
+        # parent_cached_obj_get which will check that we have permissions
+        # over the parent.
+        self.is_authenticated(request)
+        self.throttle_check(request)
+
+        nested_name = kwargs.pop('nested_name')
+
+        parent_lookup = self.get_nested_parent_lookup(nested_name)
+        if (parent_lookup is not None and
+                not self.nested_needs_parent_object(request, nested_name)):
+            lookup_kwargs = self.real_remove_api_resource_names(kwargs)
+            try:
+                parent_queryset = self.get_object_list(request).filter(
+                                                            **lookup_kwargs)
+            except ValueError:
+                return http.HttpNotFound()
+
+            return self.dispatch_nested_without_parent(request, nested_name,
+                        parent_lookup, parent_queryset, request_type,
+                        **self.remove_lookup_kwargs(kwargs))
+
+        try:
+            obj = self.parent_cached_obj_get(request=request,
+                        nested_name=nested_name,
+                        **self.remove_api_resource_names(kwargs))
+        except ObjectDoesNotExist:
+            return http.HttpNotFound()
+        except MultipleObjectsReturned:
+            return http.HttpMultipleChoices("More than one parent resource is "
+                                            "found at this URI.")
+
+        return self.dispatch_nested_with_parent(request, nested_name, obj,
+                                                request_type, **kwargs)
+
+    def dispatch_nested_aggregate(self, request, **kwargs):
+        """
+        Dispatch a request to the aggregates of a to-many nested resource.
+        See ``get_aggregate``.
+        """
+        return self.dispatch_nested(request, request_type='aggregate',
+                                    **kwargs)
+
+    def dispatch_nested_multiple(self, request, **kwargs):
+        """
+        Dispatch a request to several objects of a to-many nested resource,
+        to ``get_multiple``.
+        """
+        return self.dispatch_nested(request, request_type='multiple',
+                                    **kwargs)
+
+    def remove_lookup_kwargs(self, kwargs):
+        """
+        Return a copy of ``kwargs`` without the lookups of the object, keeping
+        only ``api_name`` and ``resource_name``.
+        """
+        lookup_kwargs = self.real_remove_api_resource_names(kwargs)
+        return dict((key, value) for key, value in kwargs.items()
+                    if key not in lookup_kwargs)
+
+    def get_nested_chain_level(self, request, nested_name, detail_uri,
+                               queryset):
+        """
+        Go one level down a chain of nested resources: return the resource
+        used as the nested ``nested_name`` of the only object in
+        ``queryset``, its parent object (``None`` when it is not fetched)
+        and a queryset with its object matching ``detail_uri``.
+
+        Raises ``NotFound`` if ``nested_name`` is not a to-many nested of the
+        resource or ``detail_uri`` is not a valid id.
+        """
+        if nested_name not in getattr(self, '_nested', {}):
+            raise NotFound("Couldn't find the nested resource '%s'." %
+                           nested_name)
+
+        parent_lookup = self.get_nested_parent_lookup(nested_name)
+        if parent_lookup is None:
+            raise NotFound("The nested resource '%s' has no objects to "
+                           "look up." % nested_name)
+
+        nested_resource = self.get_nested_resource(nested_name)
+        if not re.match(r'^(?:%s)$' %
+                        nested_resource.get_detail_uri_name_regex(),
+                        detail_uri):
+            raise NotFound("Invalid resource lookup data provided.")
+
+        object_list = nested_resource.get_object_list(request)
+        if self.nested_needs_parent_object(request, nested_name):
+            parent_object = self.get_parent_object(request, queryset, {})
+            object_list = object_list.filter(**{parent_lookup: parent_object})
+        else:
+            parent_object = None
+            object_list = object_list.filter(**{
+                        '%s__in' % parent_lookup: queryset.values('pk')})
+
+        object_list = nested_resource.apply_nested_authorization_limits(
+                        request, object_list, self, parent_object, nested_name)
+        object_list = object_list.filter(**{
+                        nested_resource._meta.detail_uri_name: detail_uri})
+
+        return nested_resource, parent_object, object_list
+
+    def dispatch_nested_chain(self, request, **kwargs):
+        """
+        Dispatch a request to a nested resource more than one level deep, such
+        as ``/user/<pk>/entries/<entry_pk>/entryinfo/``, or to an object of a
+        to-many nested resource, such as ``/user/<pk>/entries/<entry_pk>/``.
+
+        The path alternates names of nested resources and ids of their
+        objects. Each level filters the next one with a subquery, so the
+        whole chain is read in a single query. A parent along the chain is
+        only fetched when it is needed (see ``nested_needs_parent_object``).
+
+        An object of a to-many nested resource is dispatched as a detail,
+        with its ``pk`` as the lookup of the methods writing to it.
+        """
+        self.is_authenticated(request)
+        self.throttle_check(request)
+
+        segments = [kwargs.pop('nested_name')] + \
+                   kwargs.pop('nested_path').split('/')
+        lookup_kwargs = self.real_remove_api_resource_names(kwargs)
+        kwargs = self.remove_lookup_kwargs(kwargs)
+
+        try:
+            parent_resource = self
+            queryset = self.get_object_list(request).filter(**lookup_kwargs)
+
+            while len(segments) >= 2:
+                nested_name, detail_uri = segments.pop(0), segments.pop(0)
+                resource, parent_object, queryset = \
+                    parent_resource.get_nested_chain_level(request,
+                                        nested_name, detail_uri, queryset)
+                if segments:
+                    parent_resource = resource
+
+            if not segments:
+                # The path ends with the id of a nested object.
+                kwargs['nested_name'] = nested_name
+                kwargs['parent_resource'] = parent_resource
+                kwargs['parent_object'] = parent_object
+                kwargs['child_object'] = resource.get_single_object(
+                        resource.apply_related_lookups(request, queryset),
+                        {resource._meta.detail_uri_name: detail_uri})
+                kwargs['pk'] = kwargs['child_object'].pk
+                return resource.dispatch('detail', request, **kwargs)
+
+            nested_name = segments[0]
+            if nested_name not in getattr(resource, '_nested', {}):
+                raise NotFound("Couldn't find the nested resource '%s'." %
+                               nested_name)
+
+            parent_lookup = resource.get_nested_parent_lookup(nested_name)
+            if (parent_lookup is not None and
+                    not resource.nested_needs_parent_object(request,
+                                                            nested_name)):
+                return resource.dispatch_nested_without_parent(request,
+                            nested_name, parent_lookup, queryset, **kwargs)
+
+            obj = resource.get_parent_object(request, queryset,
+                        {resource._meta.detail_uri_name: detail_uri},
+                        nested_name)
+        except (NotFound, ObjectDoesNotExist, ValueError):
+            return http.HttpNotFound()
+        except MultipleObjectsReturned:
+            return http.HttpMultipleChoices("More than one resource is found "
+                                            "at this URI.")
+
+        return resource.dispatch_nested_with_parent(request, nested_name, obj,
+                                                    **kwargs)
+
     def is_authorized_nested(self, request, nested_name,
                                parent_resource, parent_object, object=None):
         """
@@ -543,10 +1727,11 @@ class ExtendedModelResource(ModelResource):
         checking.
         """
         # We use the authorization of the parent resource
-        method_name = 'is_authorized_nested_%s' % nested_name
-        if hasattr(parent_resource._meta.authorization, method_name):
-            method = getattr(parent_resource._meta.authorization, method_name)
-            auth_result = method(request, parent_object, object)
+        authorization = parent_resource._meta.authorization
+        hook = authorization_hooks.get(authorization, 'is_authorized_nested',
+                                       nested_name)
+        if hook is not None:
+            auth_result = hook(request, parent_object, object)
 
             if isinstance(auth_result, HttpResponse):
                 raise ImmediateHttpResponse(response=auth_result)
@@ -554,6 +1739,7 @@ class ExtendedModelResource(ModelResource):
             if not auth_result is True:
                 raise ImmediateHttpResponse(response=http.HttpUnauthorized())
 
+    @instrumented('dispatch')
     def dispatch(self, request_type, request, **kwargs):
         """
         Same as the usual dispatch, but knows if its being called from a nested
@@ -594,9 +1780,269 @@ class ExtendedModelResource(ModelResource):
 
         return response
 
+    def get_list(self, request, **kwargs):
+        """
+        Returns a serialized list of resources. See ``render_list``.
+
+        When used as nested, the response may come from the cache, see
+        ``cached_response``.
+        """
+        if kwargs.get('parent_resource', None) is None:
+            return self.render_list(request, **kwargs)
+
+        return self.cached_response(request, self.render_list, **kwargs)
+
+    def render_list(self, request, **kwargs):
+        """
+        Same as the original ``get_list``, but when used as nested the
+        pagination links point to the nested list (see ``get_list_uri``).
+
+        Besides, if the ``streaming_list`` option is set and the response is
+        JSON, the objects of the page are read with ``iterator`` and are
+        dehydrated and serialized ``streaming_chunk_size`` at a time, while
+        the response is being sent. The response has the same ``meta`` and
+        ``objects`` as usual, but ``alter_list_data_to_serialize`` is not
+        called.
+        """
+        objects = self.obj_get_list(request=request,
+                                    **self.remove_api_resource_names(kwargs))
+        sorted_objects = self.apply_sorting(objects, options=request.GET)
+
+        validators = self.get_validators(request, objects)
+        not_modified = self.get_not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        paginator = self._meta.paginator_class(request.GET, sorted_objects,
+                        resource_uri=self.get_list_uri(request, **kwargs),
+                        limit=self._meta.limit)
+        to_be_serialized = paginator.page()
+
+        # When used as nested, the parent may not have been fetched.
+        parent_queryset = kwargs.get('parent_queryset', None)
+        if (parent_queryset is not None and
+                self.is_empty_page(to_be_serialized) and
+                not parent_queryset.exists()):
+            return http.HttpNotFound()
+
+        if self.is_streaming(request):
+            response = StreamingHttpResponse(
+                        self.stream_list(request, to_be_serialized['meta'],
+                                         to_be_serialized['objects']),
+                        content_type=build_content_type('application/json'))
+            return self.add_validators(response, validators)
+
+        # Dehydrate the bundles in preparation for serialization.
+        field_names = self.get_sparse_fields(request)
+        bundles = [self.build_bundle(obj=obj, request=request)
+                   for obj in to_be_serialized['objects']]
+        to_be_serialized['objects'] = [self.full_dehydrate(bundle, field_names)
+                                       for bundle in bundles]
+        to_be_serialized = self.alter_list_data_to_serialize(request,
+                                                             to_be_serialized)
+        return self.add_validators(self.create_response(request,
+                                                        to_be_serialized),
+                                   validators)
+
+    def get_aggregate(self, request, **kwargs):
+        """
+        Returns the ``count`` of the list of resources, and the aggregates of
+        its fields asked for in the querystring (eg. ``?max=pub_date`` for
+        ``max_pub_date``). See ``AGGREGATE_FUNCTIONS``.
+
+        Everything is computed by the database in a single query, over the
+        same objects as ``get_list`` but without paginating them.
+
+        Should return a HttpResponse (200 OK).
+        """
+        aggregates = {'count': Count('pk')}
+
+        for function_name, function in AGGREGATE_FUNCTIONS.items():
+            for field_name in request.GET.getlist(function_name):
+                aggregates['%s_%s' % (function_name, field_name)] = \
+                    function(self.get_aggregate_attribute(field_name))
+
+        objects = self.obj_get_list(request=request,
+                                    **self.remove_api_resource_names(kwargs))
+        try:
+            data = objects.aggregate(**aggregates)
+        except ValueError:
+            raise BadRequest("Invalid resource lookup data provided "
+                             "(mismatched type).")
+
+        # When used as nested, the parent may not have been fetched.
+        parent_queryset = kwargs.get('parent_queryset', None)
+        if (parent_queryset is not None and not data['count'] and
+                not parent_queryset.exists()):
+            return http.HttpNotFound()
+
+        return self.create_response(request, data)
+
+    def get_aggregate_attribute(self, field_name):
+        """
+        Return the attribute of the model to aggregate for the field
+        ``field_name`` of the resource.
+
+        Raises ``BadRequest`` if the field is not a field of the model.
+        """
+        field = self.fields.get(field_name, None)
+        if (field is None or getattr(field, 'is_related', False) or
+                not isinstance(field.attribute, basestring)):
+            raise BadRequest("The field '%s' can't be aggregated." %
+                             field_name)
+
+        try:
+            self._meta.object_class._meta.get_field(field.attribute)
+        except FieldDoesNotExist:
+            raise BadRequest("The field '%s' can't be aggregated." %
+                             field_name)
+
+        return field.attribute
+
+    def is_empty_page(self, page):
+        """
+        Tell if there are no objects at all in the list ``page`` belongs to.
+        """
+        if 'total_count' in page['meta']:
+            return page['meta']['total_count'] == 0
+
+        objects = page['objects']
+        if hasattr(objects, 'exists'):
+            return not objects.exists()
+
+        return not objects
+
+    def is_streaming(self, request):
+        """
+        Tell if the list response to ``request`` is streamed. See
+        ``render_list``.
+        """
+        return (self._meta.streaming_list and
+                self.determine_format(request) == 'application/json')
+
+    def get_list_uri(self, request, **kwargs):
+        """
+        Return the uri of the list being requested, which is the requested
+        path when used as nested.
+        """
+        if 'parent_resource' in kwargs:
+            return request.path
+
+        return self.get_resource_list_uri()
+
+    def stream_list(self, request, meta, objects):
+        """
+        Generate the JSON of a list response, dehydrating the objects
+        ``streaming_chunk_size`` at a time.
+        """
+        serializer = self._meta.serializer
+        chunk_size = self._meta.streaming_chunk_size
+        field_names = self.get_sparse_fields(request)
+
+        if hasattr(objects, 'iterator'):
+            objects = objects.iterator()
+
+        # The chunks are serialized as JSON lists, the objects are between
+        # their brackets.
+        yield '{"meta": %s, "objects": [' % serializer.to_json(meta)
+
+        separator = ''
+        chunk = []
+        for obj in objects:
+            chunk.append(self.full_dehydrate(self.build_bundle(obj=obj,
+                                            request=request), field_names))
+
+            if len(chunk) == chunk_size:
+                yield separator + serializer.to_json(chunk)[1:-1]
+                separator = ', '
+                chunk = []
+
+        if chunk:
+            yield separator + serializer.to_json(chunk)[1:-1]
+
+        yield ']}'
+
     def get_detail(self, request, **kwargs):
         """
-        Returns a single serialized resource.
+        Returns a single serialized resource. See ``render_detail``.
+
+        The response may come from the cache, see ``cached_response``.
+        """
+        return self.cached_response(request, self.render_detail, **kwargs)
+
+    def cached_response(self, request, render, **kwargs):
+        """
+        Return the response of ``render(request, **kwargs)``, caching it if
+        the ``cache_responses`` option is set.
+
+        Successful responses are stored in the ``cache`` of the resource, and
+        reused for requests with the same path, querystring, format and
+        authorization scope, until the resource or its parent (when used as
+        nested) write to their models. ``If-None-Match`` and
+        ``If-Modified-Since`` are checked against the cached response.
+        """
+        if not self._meta.cache_responses or self.is_streaming(request):
+            return render(request, **kwargs)
+
+        cache_key = self.generate_response_cache_key(request, **kwargs)
+        cached = self._meta.cache.get(cache_key)
+        record_cache_lookup(self, request, cached is not None)
+
+        if cached is not None:
+            content, content_type, validators = cached
+
+            not_modified = self.get_not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+
+            return self.add_validators(HttpResponse(content,
+                                                    content_type=content_type),
+                                       validators)
+
+        response = render(request, **kwargs)
+
+        if response.status_code == 200:
+            last_modified = None
+            if response.has_header('Last-Modified'):
+                last_modified = parse_http_date_safe(
+                                    response['Last-Modified'])
+            validators = (response.get('ETag', None), last_modified)
+
+            self._meta.cache.set(cache_key, (response.content,
+                                             response['Content-Type'],
+                                             validators))
+
+        return response
+
+    def generate_response_cache_key(self, request, **kwargs):
+        """
+        Return the key of the cached response to ``request``. It includes
+        the versions of the model of the resource and, when used as nested,
+        of the model of the parent.
+        """
+        querystring = urlencode([(key, value) for key, values
+                                 in sorted(request.GET.lists())
+                                 for value in values])
+        request_hash = md5('%s?%s' % (request.path.encode('utf-8'),
+                                      querystring)).hexdigest()
+
+        args = [self.determine_format(request), request_hash]
+
+        parent_resource = kwargs.get('parent_resource', None)
+        if (parent_resource is not None and
+                hasattr(parent_resource._meta.cache, 'get_version')):
+            args.append('parent_version=%s' %
+                        parent_resource._meta.cache.get_version(
+                            parent_resource._meta.object_class))
+
+        return self.generate_object_cache_key('response', request, *args)
+
+    def render_detail(self, request, **kwargs):
+        """
+        Same as the original ``get_detail``, but knows when it is being
+        called from a nested resource, answers conditional requests (see
+        ``get_validators``) and supports sparse fieldsets (see
+        ``get_sparse_fields``).
 
         Calls ``cached_obj_get/obj_get`` to provide the data, then handles that
         result set and serializes it.
@@ -610,9 +2056,33 @@ class ExtendedModelResource(ModelResource):
                 obj = kwargs.pop('child_object', None)
                 if obj is None:
                     return http.HttpNotFound()
+
+                validators = self.get_object_validators(request, obj)
+            elif (self.is_conditional(request) and
+                    self.get_validator_aggregates()):
+                # The validators are checked before fetching the object.
+                try:
+                    validators = self.get_validators(request,
+                            self.get_detail_object_list(request,
+                                **self.remove_api_resource_names(kwargs)))
+                except ValueError:
+                    # The lookup doesn't match the type of its field.
+                    return http.HttpNotFound()
+                obj = None
             else:
+                validators = obj = None
+
+            if validators is not None:
+                not_modified = self.get_not_modified_response(request,
+                                                              validators)
+                if not_modified is not None:
+                    return not_modified
+
+            if obj is None:
                 obj = self.cached_obj_get(request=request,
                                     **self.remove_api_resource_names(kwargs))
+            if validators is None:
+                validators = self.get_object_validators(request, obj)
         except AttributeError:
             return http.HttpNotFound()
         except ObjectDoesNotExist:
@@ -622,37 +2092,622 @@ class ExtendedModelResource(ModelResource):
                                             "at this URI.")
 
         bundle = self.build_bundle(obj=obj, request=request)
-        bundle = self.full_dehydrate(bundle)
+        bundle = self.full_dehydrate(bundle, self.get_sparse_fields(request))
         bundle = self.alter_detail_data_to_serialize(request, bundle)
-        return self.create_response(request, bundle)
+        return self.add_validators(self.create_response(request, bundle),
+                                   validators)
 
-    def post_list(self, request, **kwargs):
+    def get_multiple(self, request, **kwargs):
         """
-        Unsupported if used as nested. Otherwise, same as original.
+        Same as original, but the objects are fetched together by
+        ``cached_get_objects_by_identifier`` instead of with one
+        ``cached_obj_get`` each.
+
+        If used as nested (eg. ``/user/<pk>/entries/set/1;2;3/``), only the
+        objects of the parent object can be returned.
         """
         if 'parent_resource' in kwargs:
-            raise NotImplementedError('You cannot post a list on a nested'
-                                      ' resource.')
+            identifiers = kwargs.pop('nested_list', '')
+        else:
+            self.method_check(request, allowed=['get'])
+            self.is_authenticated(request)
+            self.throttle_check(request)
+            identifiers = kwargs.pop('%s_list' % self._meta.detail_uri_name,
+                                     '')
+
+        identifiers = identifiers.split(';')
+        objects_by_identifier = self.cached_get_objects_by_identifier(
+                    identifiers, request=request,
+                    **self.remove_api_resource_names(kwargs))
+        field_names = self.get_sparse_fields(request)
+        objects = []
+        not_found = []
+
+        for identifier in identifiers:
+            obj = objects_by_identifier.get(identifier, None)
+            if obj is None:
+                not_found.append(identifier)
+                continue
+
+            bundle = self.build_bundle(obj=obj, request=request)
+            objects.append(self.full_dehydrate(bundle, field_names))
+
+        object_list = {
+            'objects': objects,
+        }
+
+        if not_found:
+            object_list['not_found'] = not_found
+
+        if 'parent_resource' not in kwargs:
+            self.log_throttled_access(request)
+        return self.create_response(request, object_list)
+
+    def get_validator_aggregates(self):
+        """
+        Return the aggregates computing the values the validators of a list
+        of objects (or of a single object) are built from, by name.
+
+        By default, the ``count`` of the objects with the latest
+        ``last_modified_field`` and the sum of their ``version_field``.
+        Override it to use other expressions.
+        """
+        aggregates = {}
+
+        if self._meta.last_modified_field is not None:
+            aggregates['last_modified'] = Max(self._meta.last_modified_field)
+        if self._meta.version_field is not None:
+            aggregates['version'] = Sum(self._meta.version_field)
+
+        if aggregates:
+            aggregates['count'] = Count('pk')
+
+        return aggregates
+
+    def get_validators(self, request, object_list):
+        """
+        Return the ``ETag`` and the ``Last-Modified`` of a response with the
+        objects in ``object_list``, computed with a single aggregate query,
+        or ``None`` for each one which can't be told.
+        """
+        aggregates = self.get_validator_aggregates()
+        if not aggregates:
+            return None, None
+
+        values = object_list.aggregate(**aggregates)
+        if not values.get('count', True):
+            # There is nothing to validate, the response will be a 404.
+            return None, None
+
+        return self.build_validators(request, values)
+
+    def get_object_validators(self, request, obj):
+        """
+        Same as ``get_validators``, for an object already fetched, using the
+        attributes of ``last_modified_field`` and ``version_field``.
+        """
+        values = {}
+
+        for name, lookup in (('last_modified', self._meta.last_modified_field),
+                             ('version', self._meta.version_field)):
+            if lookup is None:
+                continue
+
+            value = obj
+            for attribute in lookup.split(LOOKUP_SEP):
+                value = getattr(value, attribute, None)
+            values[name] = value
+
+        if not values:
+            return None, None
+
+        values['count'] = 1
+        return self.build_validators(request, values)
+
+    def build_validators(self, request, values):
+        """
+        Return the ``ETag`` and the ``Last-Modified`` of a response from the
+        values computed by the aggregates of ``get_validator_aggregates``.
+        """
+        # Responses in different formats get different ETags.
+        etag = '"%s"' % md5(repr((self.determine_format(request),
+                                  sorted(values.items())))).hexdigest()
+
+        last_modified = values.get('last_modified', None)
+        if last_modified is not None:
+            last_modified = timegm(last_modified.utctimetuple())
+
+        return etag, last_modified
+
+    def is_conditional(self, request):
+        """
+        Tell whether ``request`` has ``If-None-Match`` or
+        ``If-Modified-Since`` headers, which ``get_not_modified_response``
+        checks.
+        """
+        return ('HTTP_IF_NONE_MATCH' in request.META or
+                'HTTP_IF_MODIFIED_SINCE' in request.META)
+
+    def get_not_modified_response(self, request, validators):
+        """
+        Return a 304 response if the client already has the current response
+        according to the ``If-None-Match`` or ``If-Modified-Since`` headers of
+        ``request``, otherwise ``None``.
+        """
+        etag, last_modified = validators
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', None)
+        if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE', None)
+
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since.
+            if etag is None:
+                return None
+
+            etags = parse_etags(if_none_match)
+            if '*' not in etags and etag.strip('"') not in etags:
+                return None
+        elif if_modified_since is not None and last_modified is not None:
+            if_modified_since = parse_http_date_safe(if_modified_since)
+            if if_modified_since is None or last_modified > if_modified_since:
+                return None
+        else:
+            return None
+
+        return self.add_validators(http.HttpNotModified(), validators)
+
+    def add_validators(self, response, validators):
+        """
+        Add the ``ETag`` and ``Last-Modified`` headers to ``response``.
+        """
+        etag, last_modified = validators
+
+        if etag is not None:
+            response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+
+        return response
+
+    @instrumented('full_dehydrate')
+    def full_dehydrate(self, bundle, field_names=None):
+        """
+        Same as original, but if ``field_names`` is given only those fields
+        are dehydrated.
+        """
+        # Dehydrate each field.
+        for field_name, field_object in self.fields.items():
+            if field_names is not None and field_name not in field_names:
+                continue
 
-        # TODO: support this & link with the parent (consider core_filters of
-        #       the related manager to know which attribute to set.
-        return super(ExtendedModelResource, self).post_list(request, **kwargs)
+            # A touch leaky but it makes URI resolution work.
+            if getattr(field_object, 'dehydrated_type', None) == 'related':
+                field_object.api_name = self._meta.api_name
+                field_object.resource_name = self._meta.resource_name
+
+            bundle.data[field_name] = field_object.dehydrate(bundle)
+
+            # Check for an optional method to do further dehydration.
+            method = getattr(self, "dehydrate_%s" % field_name, None)
+
+            if method:
+                bundle.data[field_name] = method(bundle)
+
+        bundle = self.dehydrate(bundle)
+        return bundle
+
+    @instrumented('serialize')
+    def serialize(self, request, data, format, options=None):
+        """
+        Same as original, recorded by the ``instrumentation``.
+        """
+        return super(ExtendedModelResource, self).serialize(request, data,
+                                                            format, options)
+
+    def get_sparse_fields(self, request):
+        """
+        Return the names of the fields to return for a GET request, listed in
+        its ``sparse_fields_param`` parameter (eg. ``?fields=title,body``),
+        or ``None`` to return every field.
+
+        Raises ``BadRequest`` if a field is not a field of the resource.
+        """
+        param = self._meta.sparse_fields_param
+        if param is None or getattr(request, 'method', None) != 'GET':
+            return None
+
+        field_names = [field_name for value in request.GET.getlist(param)
+                       for field_name in value.split(',') if field_name]
+        if not field_names:
+            return None
+
+        for field_name in field_names:
+            if field_name not in self.fields:
+                raise BadRequest("The field '%s' is not a field of the "
+                                 "resource." % field_name)
+
+        return field_names
+
+    def get_sparse_attributes(self, request):
+        """
+        Return the attributes of the model needed to dehydrate the fields
+        returned for ``request`` (see ``get_sparse_fields``), or ``None`` if
+        every field is returned or they can't be told.
+
+        They can only be told when all those fields are dehydrated straight
+        from a field or a to-many relation of the model, without a
+        ``dehydrate_<field>`` method, and the resource doesn't override
+        ``dehydrate``.
+        """
+        field_names = self.get_sparse_fields(request)
+        if (field_names is None or getattr(self.dehydrate, 'im_func', None)
+                is not ModelResource.dehydrate.im_func):
+            return None
+
+        model = self._meta.object_class
+        attributes = set(['pk'])
+
+        for field_name in field_names:
+            if field_name == 'resource_uri':
+                attributes.add(self._meta.detail_uri_name)
+                continue
+
+            attribute = self.fields[field_name].attribute
+            if (not isinstance(attribute, basestring) or
+                    hasattr(self, 'dehydrate_%s' % field_name)):
+                return None
+
+            try:
+                model._meta.get_field(attribute)
+            except FieldDoesNotExist:
+                if not isinstance(getattr(model, attribute, None),
+                                  (ForeignRelatedObjectsDescriptor,
+                                   ManyRelatedObjectsDescriptor)):
+                    return None
+
+            attributes.add(attribute)
+
+        return attributes
+
+    def apply_sparse_fields(self, request, object_list):
+        """
+        Make ``object_list`` only load the columns needed to dehydrate the
+        fields returned for ``request``.
+        """
+        attributes = self.get_sparse_attributes(request)
+        if attributes is None:
+            return object_list
+
+        opts = self._meta.object_class._meta
+        only = [opts.pk.name]
+        for attribute in attributes:
+            try:
+                field = opts.get_field(attribute, many_to_many=False)
+            except FieldDoesNotExist:
+                continue
+
+            if field.name not in only:
+                only.append(field.name)
+
+        return object_list.only(*only)
+
+    def get_parent_link_field(self, related_manager):
+        """
+        Return the foreign key of the model of the resource which links the
+        objects of ``related_manager`` to its parent, using the
+        ``core_filters`` of the related manager.
+        """
+        for lookup in related_manager.core_filters.keys():
+            field_name = lookup.split(LOOKUP_SEP)[0]
+            try:
+                field = self._meta.object_class._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                continue
+
+            if isinstance(field, ForeignKey):
+                return field
+
+        raise NotImplementedError('Objects can only be created on a nested '
+                                  'resource linked to its parent by a '
+                                  'foreign key.')
+
+    def obj_create_nested_list(self, objects_data, request=None, **kwargs):
+        """
+        Create one object for each dictionary of data in ``objects_data``,
+        linked to the parent object of the nested resource.
+
+        The foreign key to the parent is found by ``get_parent_link_field``
+        and set to the parent, whatever the data says. All the objects are
+        created in a single transaction. If the ``nested_bulk_create`` option
+        is set, they are inserted with a single ``bulk_create``, which skips
+        the ``save`` method of the model, its signals and many-to-many data,
+        and leaves the primary keys of the objects unset.
+
+        ``is_authorized_nested`` is checked once for the whole list, by
+        ``dispatch``.
+        """
+        parent_object = kwargs['parent_object']
+        link_field = self.get_parent_link_field(kwargs['related_manager'])
+        link_field_names = [field_name
+                            for field_name, field_object in self.fields.items()
+                            if field_object.attribute == link_field.name]
+        bundles = []
+
+        for object_data in objects_data:
+            bundle = self.build_bundle(data=dict_strip_unicode_keys(
+                                                object_data), request=request)
+            for field_name in link_field_names:
+                bundle.data.pop(field_name, None)
+            setattr(bundle.obj, link_field.name, parent_object)
+
+            self.is_valid(bundle, request)
+            bundles.append(bundle)
+
+        with transaction.commit_on_success():
+            if self._meta.nested_bulk_create:
+                for bundle in bundles:
+                    self.full_hydrate(bundle)
+                    setattr(bundle.obj, link_field.name, parent_object)
+
+                self._meta.object_class._default_manager.bulk_create(
+                                        [bundle.obj for bundle in bundles])
+                self.invalidate_cached_objects()
+            else:
+                for bundle in bundles:
+                    self.obj_create(bundle, request=request,
+                                    **{link_field.name: parent_object})
+
+        return bundles
+
+    def create_nested_list_response(self, request, bundles,
+                                    response_class=http.HttpCreated,
+                                    **response_kwargs):
+        """
+        Return the response to a request which created objects on a nested
+        resource.
+
+        The objects are only returned if ``always_return_data`` is set and
+        they all have a primary key (``bulk_create`` doesn't set it).
+        """
+        if (not self._meta.always_return_data or
+                [bundle for bundle in bundles if bundle.obj.pk is None]):
+            return response_class(**response_kwargs)
+
+        to_be_serialized = {}
+        to_be_serialized['objects'] = [self.full_dehydrate(bundle)
+                                       for bundle in bundles]
+        to_be_serialized = self.alter_list_data_to_serialize(request,
+                                                             to_be_serialized)
+        return self.create_response(request, to_be_serialized,
+                                    response_class=response_class,
+                                    **response_kwargs)
+
+    def post_list(self, request, **kwargs):
+        """
+        Same as original if not used as nested.
+
+        If used as nested, creates the objects linked to the parent object
+        with ``obj_create_nested_list``. The data can either be a single
+        object, whose uri is returned in the ``Location`` header (unless it
+        was inserted by ``bulk_create``, which doesn't set its primary key),
+        or a list of objects in ``objects``.
+        """
+        if 'parent_resource' not in kwargs:
+            return super(ExtendedModelResource, self).post_list(request,
+                                                                **kwargs)
+
+        deserialized = self.deserialize(request, request.raw_post_data,
+                    format=request.META.get('CONTENT_TYPE', 'application/json'))
+        if 'objects' in deserialized:
+            objects_data = [self.alter_deserialized_detail_data(request, data)
+                            for data in deserialized['objects']]
+        else:
+            objects_data = [self.alter_deserialized_detail_data(request,
+                                                                deserialized)]
+
+        bundles = self.obj_create_nested_list(objects_data, request=request,
+                                              **kwargs)
+
+        if 'objects' in deserialized or bundles[0].obj.pk is None:
+            return self.create_nested_list_response(request, bundles)
+
+        return self.create_nested_list_response(request, bundles,
+                            location=self.get_resource_uri(bundles[0]))
 
     def put_list(self, request, **kwargs):
         """
-        Unsupported if used as nested. Otherwise, same as original.
+        Same as original if not used as nested.
+
+        If used as nested, replaces the objects linked to the parent object
+        with the ones in ``objects``, in a single transaction.
         """
-        if 'parent_resource' in kwargs:
-            raise NotImplementedError('You cannot put a list on a nested'
-                                      ' resource.')
-        return super(ExtendedModelResource, self).put_list(request, **kwargs)
+        if 'parent_resource' not in kwargs:
+            return super(ExtendedModelResource, self).put_list(request,
+                                                               **kwargs)
+
+        deserialized = self.deserialize(request, request.raw_post_data,
+                    format=request.META.get('CONTENT_TYPE', 'application/json'))
+        deserialized = self.alter_deserialized_list_data(request, deserialized)
+
+        if not 'objects' in deserialized:
+            raise BadRequest("Invalid data sent.")
+
+        with transaction.commit_on_success():
+            self.obj_delete_list(request=request, **kwargs)
+            bundles = self.obj_create_nested_list(deserialized['objects'],
+                                                  request=request, **kwargs)
+
+        return self.create_nested_list_response(request, bundles,
+                                                response_class=http.HttpAccepted)
 
     def patch_list(self, request, **kwargs):
         """
-        Unsupported if used as nested. Otherwise, same as original.
+        Same as original, but the objects with a ``resource_uri`` to update
+        or delete are fetched together with ``get_multiple_via_uri``, instead
+        of with one ``obj_get`` each. Everything is done in a single
+        transaction.
+
+        As in the original, the objects are updated (with
+        ``update_in_place``) and created in the order of ``objects``, then
+        the ``deleted_objects`` are deleted. If the ``bulk_update`` option is
+        set, each run of consecutive objects to update is saved by
+        ``obj_update_list`` instead of ``update_in_place``.
+
+        A ``resource_uri`` which doesn't point to an object the request is
+        authorized to get is not found (404), nothing is created for it.
+
+        If used as nested, only the objects of the parent object can be
+        updated or deleted, and the new objects are linked to it. Each run
+        of consecutive new objects is created by ``obj_create_nested_list``.
+        """
+        request = convert_post_to_patch(request)
+        deserialized = self.deserialize(request, request.raw_post_data,
+                    format=request.META.get('CONTENT_TYPE', 'application/json'))
+
+        if not 'objects' in deserialized:
+            raise BadRequest("Invalid data sent.")
+
+        objects_data = deserialized['objects']
+        deleted_uris = deserialized.get('deleted_objects', [])
+
+        if (objects_data and
+                'put' not in self._meta.detail_allowed_methods) or \
+                (deleted_uris and
+                 'delete' not in self._meta.detail_allowed_methods):
+            raise ImmediateHttpResponse(response=http.HttpMethodNotAllowed())
+
+        updated_uris = [data['resource_uri'] for data in objects_data
+                        if 'resource_uri' in data]
+
+        with transaction.commit_on_success():
+            objects, not_found = self.get_multiple_via_uri(
+                        updated_uris + deleted_uris, request=request,
+                        related_lookups=True, **kwargs)
+            if not_found:
+                raise NotFound("The URL provided '%s' was not a link to a "
+                               "valid resource." % not_found[0])
+
+            # The object to update of each data, or None to create one.
+            objects = iter(objects)
+            patches = [(next(objects) if 'resource_uri' in data else None,
+                        data) for data in objects_data]
+
+            for updating, run in groupby(patches,
+                                         lambda patch: patch[0] is not None):
+                run = list(run)
+                if updating:
+                    self.patch_list_update(request, run, **kwargs)
+                else:
+                    self.patch_list_create(request,
+                                           [data for obj, data in run],
+                                           **kwargs)
+
+            for obj in objects:
+                self.obj_delete(request=request, _obj=obj)
+
+        return http.HttpAccepted()
+
+    def patch_list_update(self, request, patches, **kwargs):
+        """
+        Update the objects of a run of ``(obj, data)`` of ``patch_list``: with
+        ``update_in_place`` each, or with a single ``obj_update_list`` if the
+        ``bulk_update`` option is set.
         """
+        bundles = []
+
+        for obj, data in patches:
+            data = dict((key, value) for key, value in data.items()
+                        if key != 'resource_uri')
+            bundle = self.build_bundle(obj=obj, request=request)
+            bundle = self.full_dehydrate(bundle)
+            bundle = self.alter_detail_data_to_serialize(request, bundle)
+
+            if not self._meta.bulk_update:
+                self.update_in_place(request, bundle, data)
+                continue
+
+            bundle.data.update(**dict_strip_unicode_keys(data))
+            self.alter_deserialized_detail_data(request, bundle.data)
+            self.is_valid(bundle, request)
+            bundles.append(bundle)
+
+        if bundles:
+            self.obj_update_list(bundles, request=request, **kwargs)
+
+    def patch_list_create(self, request, objects_data, **kwargs):
+        """
+        Create the objects of a run of data of ``patch_list``, linked to the
+        parent object if used as nested.
+        """
+        objects_data = [self.alter_deserialized_detail_data(request, data)
+                        for data in objects_data]
+
         if 'parent_resource' in kwargs:
-            raise NotImplementedError('You cannot patch a list on a nested'
-                                      ' resource.')
-        return super(ExtendedModelResource, self).patch_list(request, **kwargs)
+            self.obj_create_nested_list(objects_data, request=request,
+                                        **kwargs)
+            return
+
+        for data in objects_data:
+            bundle = self.build_bundle(data=dict_strip_unicode_keys(data),
+                                       request=request)
+            self.is_valid(bundle, request)
+            self.obj_create(bundle, request=request)
 
+    def obj_update_list(self, bundles, request=None, **kwargs):
+        """
+        Save the objects of ``bundles``, fetched from the database and whose
+        data is already valid.
+
+        Each object is saved with ``obj_update``, which doesn't fetch it
+        again. If the ``bulk_update`` option is set, the objects are hydrated
+        and the columns which changed are written with one ``UPDATE`` query
+        per batch of ``IN_LOOKUP_BATCH_SIZE`` objects and set of changed
+        values instead, which skips the ``save`` method of the model, its
+        signals, related objects and many-to-many data. Objects with a
+        changed value which can't be hashed (eg. a list) are written one at
+        a time.
+        """
+        if not self._meta.bulk_update:
+            for bundle in bundles:
+                self.obj_update(bundle, request=request, pk=bundle.obj.pk)
+            return
+
+        model = self._meta.object_class
+        using = router.db_for_write(model)
+        model_fields = [field for field in model._meta.local_fields
+                        if not field.primary_key]
+
+        for start in xrange(0, len(bundles), IN_LOOKUP_BATCH_SIZE):
+            # The values which changed and the primary keys of the objects,
+            # by the values which changed.
+            updates = {}
+
+            for bundle in bundles[start:start + IN_LOOKUP_BATCH_SIZE]:
+                original_values = [getattr(bundle.obj, field.attname)
+                                   for field in model_fields]
+                self.full_hydrate(bundle)
+
+                changes = []
+                for field, original_value in zip(model_fields,
+                                                 original_values):
+                    # Also applies ``auto_now``, as ``save`` would.
+                    value = field.pre_save(bundle.obj, False)
+                    if value != original_value:
+                        changes.append((field.name, value))
+
+                if not changes:
+                    continue
+
+                key = tuple(changes)
+                try:
+                    hash(key)
+                except TypeError:
+                    key = ('pk', bundle.obj.pk)
+                updates.setdefault(key, (changes, []))[1].append(
+                                                            bundle.obj.pk)
+
+            for changes, pks in updates.values():
+                model._default_manager.using(using).filter(
+                                            pk__in=pks).update(**dict(changes))
+
+        self.invalidate_cached_objects()
@@ -0,0 +1,51 @@
+from tastypie import fields
+
+
+class ToManyField(fields.ToManyField):
+    """
+    Same as the original ``ToManyField`` but, when the related resource is an
+    ``ExtendedModelResource``, the related objects given as uris are fetched
+    together by ``get_multiple_via_uri`` instead of with one query per uri.
+    """
+
+    def hydrate_m2m(self, bundle):
+        values = bundle.data.get(self.instance_name)
+        self.fk_resource = self.to_class()
+
+        if (self.readonly or not values or
+                not hasattr(self.fk_resource, 'get_multiple_via_uri')):
+            return super(ToManyField, self).hydrate_m2m(bundle)
+
+        uris = [value for value in values if isinstance(value, basestring)]
+        objects, not_found = self.fk_resource.get_multiple_via_uri(uris,
+                                                    request=bundle.request)
+        if not_found:
+            raise fields.ApiFieldError("Could not find the provided object via "
+                                       "resource URI '%s'." % not_found[0])
+
+        # Nothing is missing, so the objects are in the same order as the uris.
+        objects_by_uri = dict(zip(uris, objects))
+        m2m_hydrated = []
+
+        for value in values:
+            if value is None:
+                continue
+
+            if isinstance(value, basestring):
+                fk_bundle = self.fk_resource.build_bundle(
+                                obj=objects_by_uri[value],
+                                request=bundle.request)
+                m2m_hydrated.append(self.fk_resource.full_dehydrate(fk_bundle))
+                continue
+
+            kwargs = {
+                'request': bundle.request,
+            }
+
+            if self.related_name:
+                kwargs['related_obj'] = bundle.obj
+                kwargs['related_name'] = self.related_name
+
+            m2m_hydrated.append(self.build_related_resource(value, **kwargs))
+
+        return m2m_hydrated
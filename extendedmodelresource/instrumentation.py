@@ -0,0 +1,291 @@
+import threading
+import time
+from functools import wraps
+
+from django.db import connections
+from django.http import HttpRequest
+
+from tastypie.bundle import Bundle
+
+
+class NoInstrumentation(object):
+    """
+    Records nothing. The default ``instrumentation`` of
+    ``ExtendedModelResource``: instrumented methods only check ``enabled``.
+    """
+    enabled = False
+
+    def start(self, records):
+        pass
+
+    def finish(self, request, records):
+        pass
+
+    def collect(self, request, records):
+        pass
+
+    def add_headers(self, request, response, records):
+        pass
+
+
+class StageRecord(object):
+    """
+    The measures of one call to an instrumented method: its wall ``time``
+    in seconds and the SQL ``queries`` it ran, including the ones of the
+    stages it called, and the ``cache_hits`` and ``cache_misses`` of its own
+    cache lookups.
+    """
+    __slots__ = ('stage', 'resource_name', 'nested_name', 'method', 'time',
+                 'queries', 'cache_hits', 'cache_misses')
+
+    def __init__(self, stage, resource_name, nested_name, method):
+        self.stage = stage
+        self.resource_name = resource_name
+        self.nested_name = nested_name
+        self.method = method
+        self.time = 0.0
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def key(self):
+        return (self.resource_name, self.nested_name, self.method,
+                self.stage)
+
+
+class RequestRecords(object):
+    """
+    The stages recorded for a request, kept in the request while it is
+    processed.
+    """
+
+    def __init__(self, instrumentation):
+        self.instrumentation = instrumentation
+        self.stack = []
+        self.records = []
+        self.collected = 0
+        self.debug_cursors = None
+
+
+def get_request_records(request, instrumentation):
+    records = getattr(request, '_instrumentation_records', None)
+    if records is None:
+        records = RequestRecords(instrumentation)
+        request._instrumentation_records = records
+    return records
+
+
+def count_queries():
+    return sum(len(connection.queries) for connection in connections.all())
+
+
+def find_request(args, kwargs):
+    """
+    Return the request among the arguments of an instrumented method, or
+    the request of its bundle.
+    """
+    request = kwargs.get('request', None)
+    if request is not None:
+        return request
+
+    for arg in args:
+        if isinstance(arg, HttpRequest):
+            return arg
+        if isinstance(arg, Bundle):
+            return arg.request
+
+    return None
+
+
+def instrumented(stage):
+    """
+    Decorate a method of ``ExtendedModelResource`` to record its calls as
+    the stage ``stage`` of the request it receives, tagged with the
+    resource, the nested name (taken from the ``nested_name`` argument or
+    the calling stage) and the HTTP method.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = self._meta.instrumentation
+            if not instrumentation.enabled:
+                return method(self, *args, **kwargs)
+
+            request = find_request(args, kwargs)
+            if request is None:
+                return method(self, *args, **kwargs)
+
+            records = get_request_records(request, instrumentation)
+            nested_name = kwargs.get('nested_name', None)
+            if nested_name is None and records.stack:
+                nested_name = records.stack[-1].nested_name
+
+            record = StageRecord(stage, self._meta.resource_name,
+                                 nested_name, request.method)
+            records.instrumentation.start(records)
+            records.stack.append(record)
+            start_queries = count_queries()
+            start = time.time()
+
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                record.time = time.time() - start
+                record.queries = count_queries() - start_queries
+                records.stack.pop()
+                records.records.append(record)
+                if not records.stack:
+                    records.instrumentation.finish(request, records)
+
+        return wrapper
+
+    return decorator
+
+
+def record_cache_lookup(resource, request, hit):
+    """
+    Count a lookup in the cache of ``resource`` in the stage it happens in.
+    """
+    if not resource._meta.instrumentation.enabled:
+        return
+
+    records = getattr(request, '_instrumentation_records', None)
+    if records is None or not records.stack:
+        return
+
+    if hit:
+        records.stack[-1].cache_hits += 1
+    else:
+        records.stack[-1].cache_misses += 1
+
+
+class StageStats(object):
+    """
+    The sum of the measures of the calls to a stage.
+    """
+    __slots__ = ('count', 'time', 'queries', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def add(self, record):
+        self.count += 1
+        self.time += record.time
+        self.queries += record.queries
+        self.cache_hits += record.cache_hits
+        self.cache_misses += record.cache_misses
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+
+class InstrumentationCollector(NoInstrumentation):
+    """
+    Sums the wall time, SQL queries and cache hits and misses of each stage
+    of the requests in the memory of the process, by resource, nested name,
+    HTTP method and stage. Use it as the ``instrumentation`` option of the
+    resources.
+
+    SQL queries are only counted by Django when ``DEBUG`` is on, or when
+    ``count_queries`` is set: then they are recorded while the request is
+    processed, as with ``DEBUG``. If ``server_timing`` is set, the
+    responses have a ``Server-Timing`` header with the total time of each
+    stage of the request.
+    """
+    enabled = True
+
+    def __init__(self, count_queries=True, server_timing=False):
+        self.count_queries = count_queries
+        self.server_timing = server_timing
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def start(self, records):
+        if self.count_queries and records.debug_cursors is None:
+            records.debug_cursors = []
+            for connection in connections.all():
+                records.debug_cursors.append((connection,
+                                              connection.use_debug_cursor))
+                connection.use_debug_cursor = True
+
+    def finish(self, request, records):
+        if records.debug_cursors is not None:
+            for connection, use_debug_cursor in records.debug_cursors:
+                connection.use_debug_cursor = use_debug_cursor
+            records.debug_cursors = None
+
+        self.collect(request, records.records[records.collected:])
+        records.collected = len(records.records)
+
+    def collect(self, request, records):
+        """
+        Add the ``records`` of a request to the stats.
+        """
+        with self._lock:
+            for record in records:
+                stats = self._stats.get(record.key, None)
+                if stats is None:
+                    stats = self._stats[record.key] = StageStats()
+                stats.add(record)
+
+    def get_stats(self):
+        """
+        Return a dictionary with the stats of each stage, as dictionaries
+        with their ``count``, ``time``, ``queries``, ``cache_hits`` and
+        ``cache_misses``, by ``(resource_name, nested_name, method,
+        stage)``.
+        """
+        with self._lock:
+            return dict((key, stats.as_dict())
+                        for key, stats in self._stats.items())
+
+    def reset(self):
+        """
+        Drop the stats.
+        """
+        with self._lock:
+            self._stats.clear()
+
+    def add_headers(self, request, response, records):
+        """
+        Add the ``Server-Timing`` header, if ``server_timing`` is set.
+        """
+        if not self.server_timing:
+            return
+
+        stages = []
+        totals = {}
+        for record in records:
+            if record.stage not in totals:
+                stages.append(record.stage)
+                totals[record.stage] = StageStats()
+            totals[record.stage].add(record)
+
+        metrics = []
+        for stage in stages:
+            stats = totals[stage]
+            metrics.append('%s;dur=%.3f;desc="calls=%d queries=%d"' % (
+                stage, stats.time * 1000, stats.count, stats.queries))
+
+        hits = sum(totals[stage].cache_hits for stage in stages)
+        misses = sum(totals[stage].cache_misses for stage in stages)
+        if hits or misses:
+            metrics.append('cache;desc="hits=%d misses=%d"' % (hits, misses))
+
+        response['Server-Timing'] = ', '.join(metrics)
+
+
+def add_instrumentation_headers(request, response):
+    """
+    Let the instrumentation which recorded ``request`` add its headers to
+    ``response``.
+    """
+    records = getattr(request, '_instrumentation_records', None)
+    if records is not None and records.records:
+        records.instrumentation.add_headers(request, response,
+                                            records.records)
@@ -0,0 +1,163 @@
+import base64
+from urllib import urlencode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import simplejson
+
+from tastypie.exceptions import BadRequest
+from tastypie.paginator import Paginator
+
+
+class KeysetPaginator(Paginator):
+    """
+    Pages a queryset with a cursor instead of an offset. Use it as the
+    ``paginator_class`` of the resource.
+
+    The objects are ordered by the fields in ``ordering`` (prefix a field
+    with ``-`` for descending order), and each page starts right after the
+    object the ``cursor`` points to. So fetching a page costs the same no
+    matter how deep it is, and the total count of objects is never computed.
+
+    The fields in ``ordering`` must not be null, and the last one must be
+    unique (such as ``pk``). Subclass it to change them ::
+
+        class EntryPaginator(KeysetPaginator):
+            ordering = ('-pub_date', 'pk')
+
+    Since the order of the objects is the one of ``ordering``, requests
+    asking for another one with ``order_by`` are rejected.
+    """
+    ordering = ('pk',)
+    cursor_param = 'cursor'
+
+    def get_ordering_fields(self):
+        """
+        Return a list of ``(name, descending, model_field)`` for the fields
+        in ``ordering``.
+        """
+        opts = self.objects.model._meta
+        ordering_fields = []
+
+        for name in self.ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+
+            if name == 'pk':
+                field = opts.pk
+            else:
+                field = opts.get_field(name)
+
+            ordering_fields.append((name, descending, field))
+
+        return ordering_fields
+
+    def encode_cursor(self, obj):
+        """
+        Return the opaque cursor pointing to ``obj``.
+        """
+        values = [field.value_to_string(obj)
+                  for name, descending, field in self.get_ordering_fields()]
+        return base64.urlsafe_b64encode(simplejson.dumps(values))
+
+    def decode_cursor(self, cursor):
+        """
+        Return the values of the ordering fields of the object ``cursor``
+        points to.
+
+        Raises ``BadRequest`` if the cursor is not valid.
+        """
+        ordering_fields = self.get_ordering_fields()
+
+        try:
+            values = simplejson.loads(base64.urlsafe_b64decode(str(cursor)))
+            if len(values) != len(ordering_fields):
+                raise ValueError
+            return [field.to_python(value) for value, (name, descending, field)
+                    in zip(values, ordering_fields)]
+        except (TypeError, ValueError, ValidationError):
+            raise BadRequest("Invalid cursor '%s' provided." % cursor)
+
+    def get_cursor(self):
+        """
+        Return the values the requested page starts after, or ``None`` for
+        the first page.
+        """
+        cursor = self.request_data.get(self.cursor_param)
+
+        if not cursor:
+            return None
+
+        return self.decode_cursor(cursor)
+
+    def get_slice(self, limit, values):
+        """
+        Return the ordered objects that come after ``values`` (all of them if
+        it is ``None``), at most ``limit`` of them if it is not zero.
+        """
+        ordering_fields = self.get_ordering_fields()
+        objects = self.objects.order_by(
+            *[('-' if descending else '') + name
+              for name, descending, field in ordering_fields])
+
+        if values is not None:
+            # (a, b) > (x, y) is a > x OR (a = x AND b > y).
+            after = Q()
+            equal = {}
+            for (name, descending, field), value in zip(ordering_fields,
+                                                        values):
+                lookup = '%s__%s' % (name, 'lt' if descending else 'gt')
+                after |= Q(**dict(equal, **{lookup: value}))
+                equal[name] = value
+            objects = objects.filter(after)
+
+        if limit:
+            objects = objects[:limit]
+
+        return objects
+
+    def _generate_uri(self, limit, cursor):
+        if self.resource_uri is None:
+            return None
+
+        request_params = dict([k, v.encode('utf-8')]
+                              for k, v in self.request_data.items()
+                              if k != 'offset')
+        request_params.update({'limit': limit, self.cursor_param: cursor})
+        return '%s?%s' % (
+            self.resource_uri,
+            urlencode(request_params)
+        )
+
+    def page(self):
+        """
+        Generates the data of the requested page.
+
+        Fetches one object more than ``limit`` to know whether there is a
+        next page, whose uri is in ``next``.
+
+        Raises ``BadRequest`` if the request has an ``order_by``.
+        """
+        if 'order_by' in self.request_data:
+            raise BadRequest("Sorting with 'order_by' is not supported by "
+                             "this resource, which is paged with a cursor.")
+
+        limit = self.get_limit()
+        objects = self.get_slice(limit and limit + 1, self.get_cursor())
+        meta = {
+            'limit': limit,
+        }
+
+        if limit:
+            objects = list(objects)
+            meta['next'] = None
+
+            if len(objects) > limit:
+                objects = objects[:limit]
+                meta['next'] = self._generate_uri(
+                                    limit, self.encode_cursor(objects[-1]))
+
+        return {
+            'objects': objects,
+            'meta': meta,
+        }
@@ -0,0 +1,184 @@
+from urlparse import urlparse
+
+from django.core.signals import request_started
+from django.core.urlresolvers import RegexURLResolver, resolve
+from django.db import connection, reset_queries
+from django.test.client import RequestFactory
+from django.utils import simplejson
+
+
+class CaptureQueries(object):
+    """
+    Context manager recording the SQL run inside it, even if ``DEBUG`` is
+    off.
+    """
+
+    def __enter__(self):
+        self.old_debug_cursor = connection.use_debug_cursor
+        connection.use_debug_cursor = True
+        self.start = len(connection.queries)
+        request_started.disconnect(reset_queries)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        connection.use_debug_cursor = self.old_debug_cursor
+        request_started.connect(reset_queries)
+
+    @property
+    def queries(self):
+        return [query['sql'] for query in connection.queries[self.start:]]
+
+
+class ResourceClientMixin(object):
+    """
+    Mixin for ``TestCase`` classes making GET requests to resources with
+    their test client, checking the status code of the responses and
+    recording their SQL queries.
+    """
+
+    def get(self, url, status_code=200, headers=None, **params):
+        """
+        Make a GET request to ``url`` with ``params`` in the querystring
+        (``format`` is ``json`` by default) and ``headers`` in the request
+        environ (eg. ``HTTP_IF_NONE_MATCH``), and fail unless the response
+        has ``status_code``.
+
+        Returns the response and the queries it ran.
+        """
+        params.setdefault('format', 'json')
+        with CaptureQueries() as captured:
+            response = self.client.get(url, params, **(headers or {}))
+        self.assertEqual(response.status_code, status_code)
+        return response, captured.queries
+
+    def get_data(self, url, status_code=200, headers=None, **params):
+        """
+        Same as ``get``, but returns the deserialized JSON of the response
+        instead of the response.
+        """
+        response, queries = self.get(url, status_code, headers, **params)
+        return simplejson.loads(response.content), queries
+
+
+def get_view_name(url_name):
+    """
+    Return the name of an url of a resource without its ``api_`` prefix (eg.
+    ``dispatch_list`` for ``api_dispatch_list``).
+    """
+    if url_name and url_name.startswith('api_'):
+        return url_name[len('api_'):]
+    return url_name
+
+
+def get_resource_routes(resource):
+    """
+    Return the ``(resource_name, nested_name, view_name)`` of the urls from
+    ``base_urls``, ``nested_urls`` and ``detail_actions_urlpatterns`` of
+    ``resource``, as ``QueryBudgetMixin`` finds them for a request.
+    """
+    resource_name = resource._meta.resource_name
+    routes = [(resource_name, None, get_view_name(pattern.name))
+              for pattern in resource.base_urls()]
+
+    if resource.nested_urls():
+        if resource._meta.compiled_detail_urls:
+            nested_names = resource.detail_segment_views().keys()
+        else:
+            nested_names = resource._nested.keys()
+        routes.extend((resource_name, nested_name, 'dispatch_nested')
+                      for nested_name in sorted(nested_names))
+
+    for pattern in resource.detail_actions_urlpatterns():
+        if isinstance(pattern, RegexURLResolver):
+            routes.extend((resource_name, None, get_view_name(action.name))
+                          for action in pattern.url_patterns)
+        else:
+            routes.append((resource_name, None, get_view_name(pattern.name)))
+
+    return routes
+
+
+class QueryBudgetMixin(object):
+    """
+    Mixin for ``TestCase`` classes making requests to resources and failing
+    when they run more SQL queries than their budget.
+
+    ``query_budgets`` maps ``(resource_name, nested_name, method,
+    view_name)`` to the maximum number of queries of a request, where
+    ``view_name`` is the name of the url without its ``api_`` prefix (eg.
+    ``dispatch_list``, ``dispatch_detail`` or ``dispatch_nested``) and
+    ``nested_name`` is ``None`` for urls which are not nested. Requests are
+    resolved with the ``urls`` of the test case, if any.
+    """
+    query_budgets = {}
+
+    def resolve_path(self, path):
+        return resolve(urlparse(path).path, getattr(self, 'urls', None))
+
+    def get_query_budget_key(self, path, method):
+        match = self.resolve_path(path)
+        return (match.kwargs.get('resource_name', None),
+                match.kwargs.get('nested_name', None),
+                method.upper(),
+                get_view_name(match.url_name))
+
+    def build_request(self, path, method, data=None):
+        """
+        Return a request to ``path``, with ``data`` in the querystring for
+        GET requests and serialized as JSON in the body otherwise.
+        """
+        factory = RequestFactory()
+        method = method.upper()
+
+        if method == 'GET':
+            return factory.get(path, data or {})
+        if method == 'DELETE':
+            return factory.delete(path)
+
+        request = factory.post(path, data=simplejson.dumps(data or {}),
+                               content_type='application/json')
+        request.method = method
+        return request
+
+    def assertQueryBudget(self, path, method='GET', data=None,
+                          status_code=None):
+        """
+        Make a request to ``path`` and fail if it runs more queries than the
+        budget of its url, or if its url has no budget. Checks the status
+        code of the response if ``status_code`` is given.
+
+        Returns the response.
+        """
+        key = self.get_query_budget_key(path, method)
+        if key not in self.query_budgets:
+            self.fail('No query budget for %r.' % (key,))
+        budget = self.query_budgets[key]
+
+        request = self.build_request(path, method, data)
+        match = self.resolve_path(path)
+        with CaptureQueries() as captured:
+            response = match.func(request, *match.args, **match.kwargs)
+
+        if status_code is not None:
+            self.assertEqual(response.status_code, status_code)
+
+        queries = captured.queries
+        if len(queries) > budget:
+            self.fail('%s %s ran %d queries, over the budget of %d of %r:\n%s'
+                      % (method, path, len(queries), budget, key,
+                         '\n'.join(queries)))
+
+        return response
+
+    def assertRoutesHaveQueryBudgets(self, resources):
+        """
+        Fail if a route of ``resources`` (see ``get_resource_routes``) has no
+        budget for any method.
+        """
+        budgeted = set(key[:2] + key[3:] for key in self.query_budgets)
+        missing = [route for resource in resources
+                   for route in get_resource_routes(resource)
+                   if route not in budgeted]
+
+        if missing:
+            self.fail('No query budget for the routes %r.' % missing)